@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, BackgroundTasks
 
-from app.admin.api.dependencies import get_layer_service
-from app.admin.application.dtos.layer_dto import LayerDTO, LayerFormDTO
+from app.admin.api.dependencies import get_layer_service, get_authenticated_user
+from app.admin.application.dtos.layer_dto import LayerDTO, LayerFormDTO, LayerColumnsDTO, LayerColumnsFormDTO, \
+    LayerTendenciesFormDTO, LayerIndexDTO
 from app.shared.models.response import Response
+# Los análisis de las capas se calculan en el servicio web.
+from app.web.api.dependencies import get_layer_service as get_layer_analytics_service
 
 layer_router = APIRouter()
 
@@ -13,8 +16,13 @@ async def get_all(service=Depends(get_layer_service)) -> Response[list[LayerDTO]
 
 
 @layer_router.post("/", response_model=Response[str])
-async def create(layer_form_dto: LayerFormDTO, service=Depends(get_layer_service)) -> Response[str]:
-    return Response.correct(await service.create(layer_form_dto))
+async def create(layer_form_dto: LayerFormDTO, background_tasks: BackgroundTasks,
+                 service=Depends(get_layer_service),
+                 analytics_service=Depends(get_layer_analytics_service)) -> Response[str]:
+    layer_id = await service.create(layer_form_dto)
+    # Los análisis se calculan tras la ingesta y no en la primera visita al tablero.
+    background_tasks.add_task(analytics_service.refresh_analytics, layer_id)
+    return Response.correct(layer_id)
 
 
 @layer_router.get("/{layer_id}", response_model=Response[LayerFormDTO])
@@ -28,6 +36,52 @@ async def update(layer_id: str, layer_form_dto: LayerFormDTO, service=Depends(ge
     return Response.correct(await service.update(layer_id, layer_form_dto))
 
 
+@layer_router.get("/{layer_id}/columns/", response_model=Response[LayerColumnsDTO])
+async def get_columns(layer_id: str, service=Depends(get_layer_service)) -> Response[LayerColumnsDTO]:
+    return Response.correct(await service.get_columns(layer_id))
+
+
+@layer_router.put("/{layer_id}/columns/", response_model=Response[str])
+async def update_columns(layer_id: str, layer_columns_form_dto: LayerColumnsFormDTO,
+                         background_tasks: BackgroundTasks, service=Depends(get_layer_service),
+                         analytics_service=Depends(get_layer_analytics_service)) -> Response[str]:
+    result = await service.update_columns(layer_id, layer_columns_form_dto)
+    background_tasks.add_task(analytics_service.refresh_analytics, layer_id)
+    return Response.correct(result)
+
+
+@layer_router.put("/{layer_id}/tendencies/", response_model=Response[str])
+async def update_tendencies(layer_id: str, layer_tendencies_form_dto: LayerTendenciesFormDTO,
+                            background_tasks: BackgroundTasks, service=Depends(get_layer_service),
+                            analytics_service=Depends(get_layer_analytics_service)) -> Response[str]:
+    result = await service.update_tendencies(layer_id, layer_tendencies_form_dto)
+    background_tasks.add_task(analytics_service.refresh_analytics, layer_id)
+    return Response.correct(result)
+
+
+@layer_router.get("/{layer_id}/indexes/", response_model=Response[list[LayerIndexDTO]])
+async def get_indexes(layer_id: str, service=Depends(get_layer_service)) -> Response[list[LayerIndexDTO]]:
+    return Response.correct(await service.get_indexes(layer_id))
+
+
+@layer_router.post("/{layer_id}/indexes/", response_model=Response[list[LayerIndexDTO]])
+async def rebuild_indexes(layer_id: str, service=Depends(get_layer_service)) -> Response[list[LayerIndexDTO]]:
+    return Response.correct(await service.rebuild_indexes(layer_id))
+
+
+@layer_router.delete("/{layer_id}/indexes/", response_model=Response[str])
+async def drop_indexes(layer_id: str, service=Depends(get_layer_service)) -> Response[str]:
+    return Response.correct(await service.drop_indexes(layer_id))
+
+
+@layer_router.post("/{layer_id}/analytics/refresh/", response_model=Response[str],
+                   dependencies=[Depends(get_authenticated_user)])
+async def refresh_analytics(layer_id: str, background_tasks: BackgroundTasks,
+                            service=Depends(get_layer_analytics_service)) -> Response[str]:
+    background_tasks.add_task(service.refresh_analytics, layer_id)
+    return Response.correct(layer_id, "Actualización de análisis programada")
+
+
 @layer_router.delete("/{layer_id}", response_model=Response[str])
 async def delete(layer_id: str, service=Depends(get_layer_service)) -> Response[str]:
     return Response.correct(await service.delete(layer_id))
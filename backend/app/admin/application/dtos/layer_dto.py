@@ -26,3 +26,30 @@ class RegisteredLayerDTO(BaseDTO):
     schema_name: str
     table_name: str
     view_name: str
+
+
+class LayerColumnsDTO(BaseDTO):
+    columns: list[str]
+    columns_with_prefix: list[str]
+    columns_status: dict[str, bool]
+
+
+class LayerColumnsFormDTO(BaseDTO):
+    columns_with_prefix: list[str]
+    columns_status: dict[str, bool]
+
+
+class LayerTendenciesFormDTO(BaseDTO):
+    x_column: str
+    y_column: str
+    feature_columns: list[str] = []
+    models: list[str] = ["regression", "clusters", "pca"]
+    n_clusters: int = 2
+    positive_only: bool = True
+    label: Optional[str] = None
+
+
+class LayerIndexDTO(BaseDTO):
+    name: str
+    keys: dict
+    collation: Optional[dict] = None
@@ -4,6 +4,7 @@ from app.admin.application.dtos.category_dto import CategoryCreateDTO, CategoryD
 from app.admin.domain.exceptions.not_found_exception import NotFoundException
 from app.admin.domain.models.category import Category
 from app.admin.domain.repositories.category_repository import CategoryRepository
+from app.shared.infrastructure.cache.metadata_cache import metadata_cache
 
 
 class CategoryService:
@@ -61,6 +62,7 @@ class CategoryService:
         )
 
         category = await self.category_repository.save(category)
+        metadata_cache.invalidate("categories", category.id)
         return category.id
 
     async def delete(self, category_id: str) -> str:
@@ -69,6 +71,7 @@ class CategoryService:
             raise NotFoundException("categoría")
         category.delete(self.user_authenticated)
         category = await self.category_repository.save(category)
+        metadata_cache.invalidate("categories", category.id)
         return category.id
 
     def _build_tree(self, root: Category, categories: list[Category]) -> CategoryNodeDTO:
@@ -8,13 +8,17 @@ from geo.Geoserver import Geoserver
 from psycopg2.extras import RealDictCursor
 from sqlalchemy import make_url, create_engine, text
 
-from app.admin.application.dtos.layer_dto import LayerFormDTO, RegisteredLayerDTO, LayerDTO
+from app.admin.application.dtos.layer_dto import LayerFormDTO, RegisteredLayerDTO, LayerDTO, LayerColumnsDTO, \
+    LayerColumnsFormDTO, LayerTendenciesFormDTO, LayerIndexDTO
 from app.admin.domain.models.layer import Layer
 from app.admin.domain.repositories.category_repository import CategoryRepository
 from app.admin.domain.repositories.layer_information_repository import LayerInformationRepository
 from app.admin.domain.repositories.layer_repository import LayerRepository
 from app.config import settings
 from app.shared.domain.exceptions.application_exception import ApplicationException
+from app.shared.domain.utils.constants import LAYER_FILTER_MIN_OCCURRENCES, TENDENCIES_MODELS, \
+    LAYER_GEOMETRY_TOLERANCES, LAYER_GEOMETRY_LEVEL_PREFIX
+from app.shared.infrastructure.cache.metadata_cache import metadata_cache
 
 
 class LayerService:
@@ -28,17 +32,16 @@ class LayerService:
 
     async def get_all(self) -> list[LayerDTO]:
         layers: list[Layer] = await self.layer_repository.get_all()
+
+        # Todas las categorías en una sola consulta.
+        categories = await self.category_repository.get_many([x.category_id for x in layers])
+        category_names = {category.id: category.name for category in categories}
+
         result = []
         for x in layers:
-            category = await self.category_repository.get(x.category_id)
-            if category:
-                category_name = category.name
-            else:
-                category_name = "Sin categoría"
-
             result.append(LayerDTO(
                 id=x.id,
-                category_name=category_name,
+                category_name=category_names.get(x.category_id, "Sin categoría"),
                 code=x.code,
                 name=x.name,
                 is_visible=x.is_visible,
@@ -96,6 +99,120 @@ class LayerService:
         )
 
         layer = await self.layer_repository.save(layer)
+
+        # Una capa nueva con un código ya usado reemplaza sus columnas: se descartan las copias en caché.
+        metadata_cache.invalidate("layers", layer.id)
+        metadata_cache.invalidate("layer_columns", layer.layer_information_name)
+        return layer.id
+
+    async def get_columns(self, layer_id: str) -> LayerColumnsDTO:
+        layer = await self.layer_repository.get(layer_id)
+        if not layer:
+            raise ApplicationException("La capa no existe o ha sido eliminada.")
+
+        columns = await self.layer_information_repository.get_columns(layer.layer_information_name)
+        if not columns:
+            raise ApplicationException("No se ha encontrado información de columnas para la capa.")
+
+        return LayerColumnsDTO(
+            columns=columns.get("columns", []),
+            columns_with_prefix=columns.get("columns_with_prefix", []),
+            columns_status=columns.get("columns_status", {})
+        )
+
+    async def update_columns(self, layer_id: str, layer_columns_form_dto: LayerColumnsFormDTO) -> str:
+        layer = await self.layer_repository.get(layer_id)
+        if not layer:
+            raise ApplicationException("La capa no existe o ha sido eliminada.")
+
+        columns = await self.layer_information_repository.get_columns(layer.layer_information_name)
+        if not columns:
+            raise ApplicationException("No se ha encontrado información de columnas para la capa.")
+
+        if len(layer_columns_form_dto.columns_with_prefix) != len(columns.get("columns", [])):
+            raise ApplicationException("La cantidad de nombres no coincide con las columnas de la capa.")
+        if not set(layer_columns_form_dto.columns_status).issubset(columns.get("columns", [])):
+            raise ApplicationException("Se han enviado columnas que no pertenecen a la capa.")
+
+        await self.layer_information_repository.update_columns(
+            layer.layer_information_name,
+            layer_columns_form_dto.columns_with_prefix,
+            layer_columns_form_dto.columns_status
+        )
+        metadata_cache.invalidate("layer_columns", layer.layer_information_name)
+        return layer.id
+
+    async def update_tendencies(self, layer_id: str, layer_tendencies_form_dto: LayerTendenciesFormDTO) -> str:
+        layer = await self.layer_repository.get(layer_id)
+        if not layer:
+            raise ApplicationException("La capa no existe o ha sido eliminada.")
+
+        columns = await self.layer_information_repository.get_columns(layer.layer_information_name)
+        if not columns:
+            raise ApplicationException("No se ha encontrado información de columnas para la capa.")
+
+        selected_columns = [
+            layer_tendencies_form_dto.x_column,
+            layer_tendencies_form_dto.y_column,
+            *layer_tendencies_form_dto.feature_columns
+        ]
+        if not set(selected_columns).issubset(columns.get("columns", [])):
+            raise ApplicationException("Se han enviado columnas que no pertenecen a la capa.")
+        if len(set(selected_columns)) != len(selected_columns):
+            raise ApplicationException("Las columnas de tendencias no deben repetirse.")
+
+        # Los análisis públicos solo leen columnas visibles.
+        columns_status = columns.get("columns_status", {})
+        if not all(columns_status.get(column, False) for column in selected_columns):
+            raise ApplicationException("Las columnas de tendencias deben estar visibles en la capa.")
+
+        # Solo se valida el tipo si la capa fue perfilada durante la ingesta.
+        kinds = {x["name"]: x["kind"] for x in columns.get("profiles", [])}
+        if any(kinds.get(column, "numeric") != "numeric" for column in selected_columns):
+            raise ApplicationException("Las columnas de tendencias deben ser numéricas.")
+
+        if not set(layer_tendencies_form_dto.models).issubset(TENDENCIES_MODELS):
+            raise ApplicationException("Se han enviado modelos de tendencias no soportados.")
+        if layer_tendencies_form_dto.n_clusters < 2:
+            raise ApplicationException("La cantidad de clusters debe ser al menos 2.")
+
+        await self.layer_information_repository.update_tendencies(
+            layer.layer_information_name,
+            layer_tendencies_form_dto.model_dump(by_alias=False)
+        )
+        metadata_cache.invalidate("layer_columns", layer.layer_information_name)
+        return layer.id
+
+    async def get_indexes(self, layer_id: str) -> list[LayerIndexDTO]:
+        layer = await self.layer_repository.get(layer_id)
+        if not layer:
+            raise ApplicationException("La capa no existe o ha sido eliminada.")
+
+        indexes = await self.layer_information_repository.get_indexes(layer.layer_information_name)
+        return [LayerIndexDTO(name=x["name"], keys=x["keys"], collation=x["collation"]) for x in indexes]
+
+    async def rebuild_indexes(self, layer_id: str) -> list[LayerIndexDTO]:
+        layer = await self.layer_repository.get(layer_id)
+        if not layer:
+            raise ApplicationException("La capa no existe o ha sido eliminada.")
+
+        columns = await self.layer_information_repository.get_columns(layer.layer_information_name)
+        if not columns:
+            raise ApplicationException("No se ha encontrado información de columnas para la capa.")
+
+        # Se indexan las columnas de filtro detectadas en la ingesta.
+        filter_columns = [x["name"] for x in columns.get("filters") or []]
+
+        await self.layer_information_repository.drop_indexes(layer.layer_information_name)
+        await self.layer_information_repository.create_indexes(layer.layer_information_name, filter_columns)
+        return await self.get_indexes(layer_id)
+
+    async def drop_indexes(self, layer_id: str) -> str:
+        layer = await self.layer_repository.get(layer_id)
+        if not layer:
+            raise ApplicationException("La capa no existe o ha sido eliminada.")
+
+        await self.layer_information_repository.drop_indexes(layer.layer_information_name)
         return layer.id
 
     async def delete(self, layer_id: str) -> str:
@@ -243,25 +360,60 @@ class LayerService:
                     df[col] = df[col].astype(str)
                     df[col] = df[col].replace(['nan', 'NaT', 'None'], None)
 
+            columns = [col for col in df.columns if col != 'geometry']
+
             # ✅ Geometría en geojson
             df['geometry'] = gdf.geometry.apply(lambda geom: geom.__geo_interface__)
 
+            # Versiones simplificadas para las vistas alejadas: se calculan una vez y no en cada consulta.
+            for index, tolerance in enumerate(LAYER_GEOMETRY_TOLERANCES):
+                simplified = gdf.geometry.simplify(tolerance, preserve_topology=True)
+                df[f'{LAYER_GEOMETRY_LEVEL_PREFIX}{index}'] = simplified.apply(lambda geom: geom.__geo_interface__)
+
             dictionary = df.to_dict(orient='records')
 
             await self.layer_information_repository.save(code, dictionary)
 
-            columns = [col for col in df.columns if col != 'geometry']
             columns_with_prefix = [f'F_{col}' for col in columns]
             columns_status = {col: True for col in columns}
 
+            # Los filtros se calculan una sola vez aquí y no en cada consulta pública.
+            profiles, filters = self.__profile_columns(df[columns])
+
             await self.layer_information_repository.save_columns(
-                code, columns, columns_with_prefix, columns_status
+                code, columns, columns_with_prefix, columns_status, profiles, filters, list(LAYER_GEOMETRY_TOLERANCES)
             )
 
+            await self.layer_information_repository.create_indexes(code, [x["name"] for x in filters])
+
         except Exception as e:
             print(e)
             raise ApplicationException("Error al guardar los datos en MongoDB.")
 
+    @staticmethod
+    def __profile_columns(df: pd.DataFrame) -> tuple[list[dict], list[dict]]:
+        profiles = []
+        filters = []
+        for col in df.columns:
+            values = df[col].dropna()
+            counts = values.value_counts()
+            is_numeric = not values.empty and pd.to_numeric(values, errors='coerce').notna().all()
+
+            profiles.append({
+                "name": col,
+                "kind": "numeric" if is_numeric else "string",
+                "cardinality": int(counts.size),
+                "count": int(values.size),
+            })
+
+            if not counts.empty and counts.max() >= LAYER_FILTER_MIN_OCCURRENCES:
+                filters.append({
+                    "name": col,
+                    "options": sorted(counts.index.tolist()),
+                })
+
+        return profiles, filters
+
     async def __register_in_geodatabase(self, code: str, shape_file_name: str) -> RegisteredLayerDTO:
         try:
             # Lectura del archivo SHP.
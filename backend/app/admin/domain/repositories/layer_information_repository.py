@@ -1,4 +1,5 @@
 from abc import abstractmethod, ABC
+from typing import Optional
 
 
 class LayerInformationRepository(ABC):
@@ -6,5 +7,24 @@ class LayerInformationRepository(ABC):
     async def save(self, collection_name: str, dictionary: list[dict]) -> str:
         pass
 
-    async def save_columns(self, code, columns, columns_with_prefix, columns_status):
+    async def save_columns(self, code, columns, columns_with_prefix, columns_status, profiles, filters,
+                           geometry_levels):
+        pass
+
+    async def get_columns(self, code: str) -> Optional[dict]:
+        pass
+
+    async def update_columns(self, code: str, columns_with_prefix: list[str], columns_status: dict[str, bool]) -> None:
+        pass
+
+    async def update_tendencies(self, code: str, tendencies: dict) -> None:
+        pass
+
+    async def create_indexes(self, collection_name: str, columns: list[str]) -> list[str]:
+        pass
+
+    async def get_indexes(self, collection_name: str) -> list[dict]:
+        pass
+
+    async def drop_indexes(self, collection_name: str) -> None:
         pass
@@ -1,7 +1,13 @@
+from typing import Optional
+
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, GEOSPHERE, IndexModel
+from pymongo.errors import OperationFailure
 
 from app.admin.domain.repositories.layer_information_repository import LayerInformationRepository
 from app.shared.db.base import database
+from app.shared.domain.utils.constants import LAYER_COLLATION, LAYER_MAX_FILTER_INDEXES
 
 
 class LayerInformationRepositoryImpl(LayerInformationRepository):
@@ -11,11 +17,76 @@ class LayerInformationRepositoryImpl(LayerInformationRepository):
             await collection.insert_many(dictionaries)
         return collection_name
 
-    async def save_columns(self, code: str, columns: list[str], columns_with_prefix: list[str], columns_status: list[bool]) -> None:
+    async def save_columns(self, code: str, columns: list[str], columns_with_prefix: list[str],
+                           columns_status: dict[str, bool], profiles: list[dict], filters: list[dict],
+                           geometry_levels: list[float]) -> None:
         collection: AsyncIOMotorCollection = database.get_collection("layer_columns")
-        await collection.insert_one({
+        await collection.update_one({"code": code}, {"$set": {
             "code": code,
             "columns": columns,
             "columns_with_prefix": columns_with_prefix,
-            "columns_status": columns_status
-        })
+            "columns_status": columns_status,
+            "profiles": profiles,
+            "filters": filters,
+            "geometry_levels": geometry_levels,
+            "version": str(ObjectId())
+        }}, upsert=True)
+
+    async def get_columns(self, code: str) -> Optional[dict]:
+        collection: AsyncIOMotorCollection = database.get_collection("layer_columns")
+        return await collection.find_one({"code": code}, {"_id": 0})
+
+    async def update_columns(self, code: str, columns_with_prefix: list[str], columns_status: dict[str, bool]) -> None:
+        collection: AsyncIOMotorCollection = database.get_collection("layer_columns")
+        # Cada cambio genera una nueva versión para descartar las copias en caché de la capa.
+        await collection.update_one({"code": code}, {"$set": {
+            "columns_with_prefix": columns_with_prefix,
+            "columns_status": columns_status,
+            "version": str(ObjectId())
+        }})
+
+    async def update_tendencies(self, code: str, tendencies: dict) -> None:
+        collection: AsyncIOMotorCollection = database.get_collection("layer_columns")
+        await collection.update_one({"code": code}, {"$set": {
+            "tendencies": tendencies,
+            "version": str(ObjectId())
+        }})
+
+    async def create_indexes(self, collection_name: str, columns: list[str]) -> list[str]:
+        collection: AsyncIOMotorCollection = database.get_collection(collection_name)
+        created = []
+
+        # Índices de filtros con la misma intercalación que usan las consultas públicas.
+        if columns:
+            try:
+                created += await collection.create_indexes([
+                    IndexModel([(column, ASCENDING)], collation=LAYER_COLLATION)
+                    for column in columns[:LAYER_MAX_FILTER_INDEXES]
+                ])
+            except OperationFailure as e:
+                # Sin índices las consultas son más lentas, pero los datos ya están guardados.
+                print(e)
+
+        try:
+            created.append(await collection.create_index([("geometry", GEOSPHERE)]))
+        except OperationFailure as e:
+            # Geometrías inválidas impiden el índice espacial; la capa sigue siendo utilizable.
+            print(e)
+
+        return created
+
+    async def get_indexes(self, collection_name: str) -> list[dict]:
+        collection: AsyncIOMotorCollection = database.get_collection(collection_name)
+        return [
+            {
+                "name": index["name"],
+                "keys": dict(index["key"]),
+                "collation": index.get("collation")
+            }
+            async for index in collection.list_indexes()
+            if index["name"] != "_id_"
+        ]
+
+    async def drop_indexes(self, collection_name: str) -> None:
+        collection: AsyncIOMotorCollection = database.get_collection(collection_name)
+        await collection.drop_indexes()
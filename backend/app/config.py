@@ -28,6 +28,28 @@ class Settings:
 
     STORAGE_PATH: str = os.getenv("STORAGE_PATH", "/storage")
 
+    # Layer analytics configuration.
+
+    LAYER_SNAPSHOT_CACHE_MAX_BYTES: int = int(os.getenv("LAYER_SNAPSHOT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+    # Origen de los conteos de resúmenes y gráficos: "aggregation" (MongoDB) o "snapshot" (pandas).
+    LAYER_ANALYTICS_SOURCE: str = os.getenv("LAYER_ANALYTICS_SOURCE", "aggregation")
+    TENDENCIES_POOL_SIZE: int = int(os.getenv("TENDENCIES_POOL_SIZE", 2))
+    TENDENCIES_CACHE_SIZE: int = int(os.getenv("TENDENCIES_CACHE_SIZE", 64))
+    LAYER_COLUMN_PLAN_CACHE_SIZE: int = int(os.getenv("LAYER_COLUMN_PLAN_CACHE_SIZE", 256))
+    LAYER_TILE_CACHE_MAX_BYTES: int = int(os.getenv("LAYER_TILE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    LAYER_TILE_CACHE_PATH: str = os.getenv("LAYER_TILE_CACHE_PATH", os.path.join(STORAGE_PATH, "tiles"))
+
+    # Metadata cache configuration.
+
+    METADATA_CACHE_TTL: int = int(os.getenv("METADATA_CACHE_TTL", 60))
+    METADATA_CACHE_SIZE: int = int(os.getenv("METADATA_CACHE_SIZE", 1024))
+    METADATA_CHANGE_STREAM: bool = os.getenv("METADATA_CHANGE_STREAM", "true").lower() == "true"
+
+    # Repository configuration.
+
+    # Fuerza la validación de pydantic también en los repositorios de lectura confiable (depuración).
+    REPOSITORY_VALIDATE_READS: bool = os.getenv("REPOSITORY_VALIDATE_READS", "false").lower() == "true"
+
     # PostGIS configuration.
 
     POSTGIS_STRING_CONNECTION: str = os.getenv("POSTGIS_STRING_CONNECTION",
@@ -1,18 +1,33 @@
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, Optional, List
+from typing import Generic, TypeVar, Optional, List, AsyncIterator, Tuple
 
 T = TypeVar("T")
 
 
 class CRUDRepository(ABC, Generic[T]):
     @abstractmethod
-    async def get_all(self, filters: Optional[dict] = None) -> List[T]:
+    async def get_all(self, filters: Optional[dict] = None, projection: Optional[List[str]] = None,
+                      sort: Optional[List[Tuple[str, int]]] = None, skip: int = 0, limit: int = 0) -> List[T]:
+        pass
+
+    @abstractmethod
+    def iterate(self, filters: Optional[dict] = None, projection: Optional[List[str]] = None,
+                sort: Optional[List[Tuple[str, int]]] = None, skip: int = 0, limit: int = 0) -> AsyncIterator[T]:
+        pass
+
+    @abstractmethod
+    async def get_page(self, filters: Optional[dict] = None, cursor: Optional[str] = None, limit: int = 100,
+                       projection: Optional[List[str]] = None) -> Tuple[List[T], Optional[str]]:
         pass
 
     @abstractmethod
     async def get(self, user_id: str) -> Optional[T]:
         pass
 
+    @abstractmethod
+    async def get_many(self, document_ids: List[str]) -> List[T]:
+        pass
+
     @abstractmethod
     async def find(self, param) -> Optional[T]:
         pass
@@ -21,6 +36,14 @@ class CRUDRepository(ABC, Generic[T]):
     async def save(self, user: T) -> T:
         pass
 
+    @abstractmethod
+    async def save_many(self, documents: List[T]) -> List[T]:
+        pass
+
+    @abstractmethod
+    async def delete_many(self, document_ids: List[str], user_deleted: str) -> int:
+        pass
+
     @abstractmethod
     async def exists(self, filters: Optional[dict] = None) -> bool:
         pass
@@ -3,6 +3,55 @@ ZERO = 0
 
 COORDINATE_SYSTEM = "EPSG:4326"
 
+LAYER_TABLE_MAX_PAGE_SIZE = 1000
+REPOSITORY_MAX_PAGE_SIZE = 1000
+LAYER_GEOJSON_MAX_BATCH_SIZE = 1000
+LAYER_FILTER_MIN_OCCURRENCES = 10
+# MongoDB admite 64 índices por colección; se reservan dos para _id y el índice 2dsphere.
+LAYER_MAX_FILTER_INDEXES = 62
+
+# Intercalación de las colecciones geo_<code>: ignora mayúsculas, pero no tildes.
+LAYER_COLLATION = {"locale": "es", "strength": 2}
+FILTER_MATCH_MODES = ("exact", "prefix", "contains")
+# Tipos aceptados como valor de un filtro (o como opción de una lista de valores).
+FILTER_VALUE_TYPES = (str, int, float)
+
+# Por encima de este ancho (en grados) la vista cubre casi todo el mundo y no se filtra por extensión.
+LAYER_BBOX_MAX_SPAN = 180
+
+# Tolerancias (en grados) de las geometrías simplificadas que se guardan junto a la original, de la más
+# gruesa a la más fina. Cada nivel se guarda en el campo geometry_s<índice>.
+LAYER_GEOMETRY_TOLERANCES = (0.01, 0.001, 0.0001)
+LAYER_GEOMETRY_LEVEL_PREFIX = "geometry_s"
+LAYER_GEOMETRY_FIELDS = ("geometry", *(f"{LAYER_GEOMETRY_LEVEL_PREFIX}{index}"
+                                       for index in range(len(LAYER_GEOMETRY_TOLERANCES))))
+MAP_TILE_SIZE = 256
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+MVT_EXTENT = 4096
+MVT_MAX_ZOOM = 22
+# Costo mínimo de cada tesela en la caché: las vacías también cuentan para el límite de bytes.
+MVT_TILE_ENTRY_OVERHEAD = 256
+
+ANALYTICS_KINDS = ("summary", "graphs", "tendencies")
+TENDENCIES_MODELS = ("regression", "clusters", "pca")
+
+STREAM_FORMATS = {
+    "geojson": "application/geo+json",
+    "ndjson": "application/x-ndjson",
+}
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Cuantización por defecto de TopoJSON: la extensión de la respuesta se divide en una malla de este tamaño.
+TOPOJSON_QUANTIZATION = 100_000
+
+# Formatos binarios de descarga: tipo de contenido y extensión del archivo.
+EXPORT_FORMATS = {
+    "flatgeobuf": ("application/flatgeobuf", "fgb"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
 OUTPUT_HTML = "text/html"
 
 WMS_FORMAT_LABELS = {
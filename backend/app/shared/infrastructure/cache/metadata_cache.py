@@ -0,0 +1,83 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, Optional
+
+from cachetools import TTLCache
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.config import settings
+
+# Colecciones de metadatos que se leen en cada petición pública y solo cambian desde la administración.
+METADATA_COLLECTIONS = ("layers", "categories", "layer_columns")
+
+
+# Caché de lectura para documentos de metadatos, por colección y clave, con expiración (TTL).
+# Las escrituras de la administración invalidan las claves en este proceso; el flujo de cambios de
+# MongoDB lo hace en el resto de procesos. Si el flujo no está disponible (MongoDB sin réplica),
+# el TTL limita cuánto tiempo puede verse un dato desactualizado.
+class MetadataCache:
+    def __init__(self, ttl: int, max_size: int):
+        self.__cache: TTLCache = TTLCache(maxsize=max_size, ttl=ttl)
+        self.__task: Optional[asyncio.Task] = None
+
+    async def get(self, collection_name: str, key: Hashable, loader: Callable[[], Awaitable]):
+        value = self.__cache.get((collection_name, key))
+        if value is not None:
+            return value
+
+        value = await loader()
+        # Los documentos inexistentes no se guardan: podrían crearse en cualquier momento.
+        if value is not None:
+            self.__cache[(collection_name, key)] = value
+        return value
+
+    def invalidate(self, collection_name: str, key: Optional[Hashable] = None) -> None:
+        if key is not None:
+            self.__cache.pop((collection_name, key), None)
+            return
+
+        for cache_key in [x for x in self.__cache.keys() if x[0] == collection_name]:
+            self.__cache.pop(cache_key, None)
+
+    def start(self, database: AsyncIOMotorDatabase) -> None:
+        if settings.METADATA_CHANGE_STREAM and self.__task is None:
+            self.__task = asyncio.create_task(self.__watch(database))
+
+    async def stop(self) -> None:
+        if self.__task is not None:
+            self.__task.cancel()
+            try:
+                await self.__task
+            except asyncio.CancelledError:
+                pass
+            self.__task = None
+
+    async def __watch(self, database: AsyncIOMotorDatabase) -> None:
+        pipeline = [{"$match": {"ns.coll": {"$in": list(METADATA_COLLECTIONS)}}}]
+        while True:
+            try:
+                async with database.watch(pipeline) as stream:
+                    async for change in stream:
+                        self.__on_change(change)
+            except OperationFailure as e:
+                # Los flujos de cambios requieren un conjunto de réplicas: queda solo el TTL.
+                print(e)
+                return
+            except PyMongoError as e:
+                print(e)
+                # Los cambios perdidos durante la reconexión no se conocen: se descarta todo.
+                self.__cache.clear()
+                await asyncio.sleep(settings.METADATA_CACHE_TTL)
+
+    def __on_change(self, change: dict) -> None:
+        collection_name = change["ns"]["coll"]
+        if collection_name == "layer_columns":
+            # El documento se lee por código y el evento solo trae el _id.
+            self.invalidate(collection_name)
+            return
+
+        document_id = change.get("documentKey", {}).get("_id")
+        self.invalidate(collection_name, str(document_id) if document_id is not None else None)
+
+
+metadata_cache = MetadataCache(settings.METADATA_CACHE_TTL, settings.METADATA_CACHE_SIZE)
@@ -1,32 +1,91 @@
-from typing import List, Optional, Dict, Any, Type, TypeVar
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Type, TypeVar, AsyncIterator, Tuple
 
 from bson import ObjectId
+from bson.errors import InvalidId
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
 from pydantic import BaseModel
 
+from app.config import settings
+from app.shared.domain.exceptions.application_exception import ApplicationException
+from app.shared.domain.utils.constants import REPOSITORY_MAX_PAGE_SIZE
+from app.shared.infrastructure.persistence.repository.document_loader import DocumentLoader
+
 T = TypeVar('T', bound=BaseModel)
 
 
 class BaseRepository:
-    def __init__(self, collection: AsyncIOMotorCollection, model: Type[T]):
+    def __init__(self, collection: AsyncIOMotorCollection, model: Type[T], trusted: bool = False):
         self.collection = collection
         self.model = model
+        # Lectura confiable: los documentos los escribió la propia aplicación, se omite la validación.
+        self.trusted = trusted and not settings.REPOSITORY_VALIDATE_READS
 
-    async def get_all(self, filters: Optional[dict] = None) -> List[T]:
-        result = []
-        filters = filters or {}
-        filters['status'] = True
-        async for document in self.collection.find(filters):
-            document["id"] = str(document.pop("_id"))
-            result.append(self.model(**document))
-        return result
+    async def get_all(self, filters: Optional[dict] = None, projection: Optional[List[str]] = None,
+                      sort: Optional[List[Tuple[str, int]]] = None, skip: int = 0, limit: int = 0) -> List[T]:
+        return [document async for document in self.iterate(filters, projection, sort, skip, limit)]
+
+    async def iterate(self, filters: Optional[dict] = None, projection: Optional[List[str]] = None,
+                      sort: Optional[List[Tuple[str, int]]] = None, skip: int = 0,
+                      limit: int = 0) -> AsyncIterator[T]:
+        # Entrega los documentos a medida que llegan del cursor, sin armar la lista completa.
+        cursor = self.collection.find(self.__get_filters(filters), self.__get_projection(projection))
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+
+        async for document in cursor:
+            yield self._to_model(document, projection)
+
+    async def get_page(self, filters: Optional[dict] = None, cursor: Optional[str] = None, limit: int = 100,
+                       projection: Optional[List[str]] = None) -> Tuple[List[T], Optional[str]]:
+        if not 1 <= limit <= REPOSITORY_MAX_PAGE_SIZE:
+            raise ApplicationException(f"El tamaño de página debe estar entre 1 y {REPOSITORY_MAX_PAGE_SIZE}")
+
+        # Paginación por conjunto de claves sobre _id: el costo no crece con el número de página.
+        filters = self.__get_filters(filters)
+        if cursor:
+            try:
+                filters["_id"] = {"$gt": ObjectId(cursor)}
+            except InvalidId:
+                raise ApplicationException("El cursor de paginación no es válido")
+
+        # Se pide un documento adicional para saber si existe una página siguiente.
+        documents = [
+            document async for document in self.iterate(filters, projection, [("_id", ASCENDING)], limit=limit + 1)
+        ]
+        if len(documents) > limit:
+            documents = documents[:limit]
+            return documents, documents[-1].id
+        return documents, None
 
     async def get(self, document_id: str) -> Optional[T]:
-        document: Optional[Dict[str, Any]] = await self.collection.find_one({"_id": ObjectId(document_id)})
+        object_id = ObjectId(document_id)
+        # Dentro de una petición, las lecturas por _id se agrupan y se memorizan.
+        loader = DocumentLoader.current(self.collection)
+        if loader:
+            document: Optional[Dict[str, Any]] = await loader.load(object_id)
+        else:
+            document = await self.collection.find_one({"_id": object_id})
         if not document:
             return None
-        document["id"] = str(document.pop("_id"))
-        return self.model(**document)
+        return self._to_model(document)
+
+    async def get_many(self, document_ids: List[str]) -> List[T]:
+        # Una sola consulta $in para varios identificadores (sin repetidos).
+        object_ids = [ObjectId(document_id) for document_id in dict.fromkeys(document_ids)]
+        if not object_ids:
+            return []
+
+        result = []
+        async for document in self.collection.find({"_id": {"$in": object_ids}}):
+            result.append(self._to_model(document))
+        return result
 
     async def save(self, document: T) -> T:
         document_dict = document.model_dump()
@@ -35,17 +94,97 @@ class BaseRepository:
         if document_id:
             document_dict.pop("id", None)
             await self.collection.update_one({"_id": ObjectId(document.id)}, {"$set": document_dict})
+            loader = DocumentLoader.current(self.collection)
+            if loader:
+                loader.forget(ObjectId(document_id))
             return document
         else:
             document.id = str((await self.collection.insert_one(document_dict)).inserted_id)
             return document
 
+    async def save_many(self, documents: List[T]) -> List[T]:
+        if not documents:
+            return []
+
+        # Una sola ida y vuelta para todas las escrituras; sin orden, un error no detiene al resto.
+        operations = []
+        inserted = []
+        for index, document in enumerate(documents):
+            document_dict = document.model_dump()
+            document_dict.pop("id", None)
+            if document.id:
+                operations.append(UpdateOne({"_id": ObjectId(document.id)}, {"$set": document_dict}))
+            else:
+                operations.append(InsertOne(document_dict))
+                inserted.append((index, document, document_dict))
+
+        # None: no se sabe qué se escribió (p. ej. sin conexión); no se asignan identificadores.
+        failed: Optional[set[int]] = None
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+            failed = set()
+        except BulkWriteError as e:
+            # Sin orden, las demás escrituras sí se aplicaron.
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            print(e)
+            raise ApplicationException(f"No se pudieron guardar {len(failed)} de {len(documents)} documentos")
+        finally:
+            # El controlador asigna el _id de cada inserción en el mismo diccionario.
+            if failed is not None:
+                for index, document, document_dict in inserted:
+                    if index not in failed:
+                        document.id = str(document_dict["_id"])
+
+            loader = DocumentLoader.current(self.collection)
+            if loader:
+                for document in documents:
+                    if document.id:
+                        loader.forget(ObjectId(document.id))
+        return documents
+
+    async def delete_many(self, document_ids: List[str], user_deleted: str) -> int:
+        object_ids = [ObjectId(document_id) for document_id in dict.fromkeys(document_ids)]
+        if not object_ids:
+            return 0
+
+        # Eliminación lógica, igual que Base.delete, en una sola actualización.
+        result = await self.collection.update_many({"_id": {"$in": object_ids}}, {"$set": {
+            "status": False,
+            "user_updated": user_deleted,
+            "updated_at": datetime.now()
+        }})
+
+        loader = DocumentLoader.current(self.collection)
+        if loader:
+            for object_id in object_ids:
+                loader.forget(object_id)
+        return result.modified_count
+
     async def find(self, param: dict) -> Optional[T]:
         document: Optional[Dict[str, Any]] = await self.collection.find_one(param)
         if not document:
             return None
-        document["id"] = str(document.pop("_id"))
-        return self.model(**document)
+        return self._to_model(document)
 
     async def exists(self, filters: Optional[dict] = None) -> bool:
         return await self.collection.count_documents(filters) > 0
+
+    def _to_model(self, document: Dict[str, Any], projection: Optional[List[str]] = None) -> T:
+        # Se arma un diccionario nuevo: el documento recibido no se modifica.
+        values = {key: value for key, value in document.items() if key != "_id"}
+        values["id"] = str(document["_id"])
+        if projection or self.trusted:
+            # Un documento proyectado no tiene todos los campos obligatorios: no se valida.
+            return self.model.model_construct(**values)
+        return self.model(**values)
+
+    @staticmethod
+    def __get_filters(filters: Optional[dict]) -> dict:
+        # Copia: no se modifica el diccionario recibido.
+        return {**(filters or {}), "status": True}
+
+    @staticmethod
+    def __get_projection(projection: Optional[List[str]]) -> Optional[Dict[str, int]]:
+        if not projection:
+            return None
+        return {field: 1 for field in projection if field != "id"} or {"_id": 1}
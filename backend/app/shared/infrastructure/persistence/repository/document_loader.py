@@ -0,0 +1,78 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+_loaders: ContextVar[Optional[Dict[str, "DocumentLoader"]]] = ContextVar("document_loaders", default=None)
+
+
+# Agrupa las lecturas por _id de una colección hechas en la misma vuelta del bucle de eventos en una
+# sola consulta $in, y memoriza los documentos durante la petición. Fuera de una petición no se usa.
+class DocumentLoader:
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.__collection = collection
+        self.__memo: Dict[ObjectId, asyncio.Future] = {}
+        self.__pending: Dict[ObjectId, asyncio.Future] = {}
+        self.__tasks: set[asyncio.Task] = set()
+
+    @staticmethod
+    @contextmanager
+    def scope() -> Iterator[None]:
+        token = _loaders.set({})
+        try:
+            yield
+        finally:
+            _loaders.reset(token)
+
+    @staticmethod
+    def current(collection: AsyncIOMotorCollection) -> Optional["DocumentLoader"]:
+        loaders = _loaders.get()
+        if loaders is None:
+            return None
+
+        loader = loaders.get(collection.full_name)
+        if loader is None:
+            loader = loaders[collection.full_name] = DocumentLoader(collection)
+        return loader
+
+    async def load(self, document_id: ObjectId) -> Optional[Dict[str, Any]]:
+        future = self.__memo.get(document_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self.__memo[document_id] = loop.create_future()
+            if not self.__pending:
+                # La consulta sale en la siguiente vuelta, con todos los _id pedidos en esta.
+                loop.call_soon(self.__dispatch)
+            self.__pending[document_id] = future
+
+        # shield: si una petición se cancela, no se cancela la lectura compartida.
+        return await asyncio.shield(future)
+
+    def forget(self, document_id: ObjectId) -> None:
+        self.__memo.pop(document_id, None)
+
+    def __dispatch(self) -> None:
+        pending, self.__pending = self.__pending, {}
+        task = asyncio.ensure_future(self.__fetch(pending))
+        self.__tasks.add(task)
+        task.add_done_callback(self.__tasks.discard)
+
+    async def __fetch(self, pending: Dict[ObjectId, asyncio.Future]) -> None:
+        try:
+            documents = {
+                document["_id"]: document
+                async for document in self.__collection.find({"_id": {"$in": list(pending)}})
+            }
+        except Exception as e:
+            for document_id, future in pending.items():
+                self.__memo.pop(document_id, None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for document_id, future in pending.items():
+            if not future.done():
+                future.set_result(documents.get(document_id))
@@ -10,15 +10,19 @@ from app.web.application.services.wms_layer_service import WmsLayerService
 from app.web.domain.repositories.base_layer_repository import BaseLayerRepository
 from app.web.domain.repositories.category_repository import CategoryRepository
 from app.web.domain.repositories.initial_settings_repository import InitialSettingsRepository
+from app.web.domain.repositories.layer_analytics_repository import LayerAnalyticsRepository
 from app.web.domain.repositories.layer_information_repository import LayerInformationRepository
 from app.web.domain.repositories.layer_repository import LayerRepository
+from app.web.domain.repositories.layer_tile_repository import LayerTileRepository
 from app.web.domain.repositories.wms_layer_repository import WmsLayerRepository
 from app.web.infrastructure.persistence.repository.base_layer_repository_impl import BaseLayerRepositoryImpl
 from app.web.infrastructure.persistence.repository.category_repository import CategoryRepositoryImpl
 from app.web.infrastructure.persistence.repository.initial_settings_repository_impl import InitialSettingsRepositoryImpl
+from app.web.infrastructure.persistence.repository.layer_analytics_repository_impl import LayerAnalyticsRepositoryImpl
 from app.web.infrastructure.persistence.repository.layer_information_repository_impl import \
     LayerInformationRepositoryImpl
 from app.web.infrastructure.persistence.repository.layer_repository_impl import LayerRepositoryImpl
+from app.web.infrastructure.persistence.repository.layer_tile_repository_impl import LayerTileRepositoryImpl
 from app.web.infrastructure.persistence.repository.wms_layer_repository_impl import WmsLayerRepositoryImpl
 
 
@@ -63,6 +67,9 @@ def get_layer_service(
         layer_repository: LayerRepository = Depends(LayerRepositoryImpl),
         wms_layer_repository: WmsLayerRepository = Depends(WmsLayerRepositoryImpl),
         category_repository: CategoryRepository = Depends(CategoryRepositoryImpl),
-        layer_information_repository: LayerInformationRepository = Depends(LayerInformationRepositoryImpl)
+        layer_information_repository: LayerInformationRepository = Depends(LayerInformationRepositoryImpl),
+        layer_analytics_repository: LayerAnalyticsRepository = Depends(LayerAnalyticsRepositoryImpl),
+        layer_tile_repository: LayerTileRepository = Depends(LayerTileRepositoryImpl)
 ):
-    return LayerService(layer_repository, wms_layer_repository, category_repository, layer_information_repository)
+    return LayerService(layer_repository, wms_layer_repository, category_repository, layer_information_repository,
+                        layer_analytics_repository, layer_tile_repository)
@@ -1,13 +1,25 @@
-from fastapi import APIRouter, Depends, Body
+from typing import Optional
 
+from fastapi import APIRouter, Depends, Body, Query, Header
+from fastapi.responses import StreamingResponse, Response as HttpResponse
+
+from app.shared.domain.utils.constants import STREAM_FORMATS, MVT_MEDIA_TYPE, EXPORT_FORMATS
 from app.shared.models.response import Response
 from app.web.api.dependencies import get_layer_service
 from app.web.application.dtos.layer_dto import LayerSearchDTO, LayerDTO
-from app.web.application.dtos.layer_information_dto import LayerInformationTableDTO
+from app.web.application.dtos.layer_information_dto import LayerInformationTableDTO, LayerInformationTableSearchDTO, \
+    LayerFeatureSearchDTO, LayerGeometrySearchDTO
 
 layer_router = APIRouter()
 
 
+def export_response(content: bytes, output_format: str, file_name: str) -> HttpResponse:
+    media_type, extension = EXPORT_FORMATS[output_format]
+    return HttpResponse(content=content, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{file_name}.{extension}"'
+    })
+
+
 @layer_router.get("/", response_model=Response[list[LayerDTO]])
 async def get_all(
         layer_search_dto: LayerSearchDTO = Depends(LayerSearchDTO),
@@ -27,27 +39,73 @@ async def get_by_id(
 @layer_router.get("/{layer_id}/tables/", response_model=Response[LayerInformationTableDTO])
 async def get_table(
         layer_id: str,
+        table_search_dto: LayerInformationTableSearchDTO = Depends(LayerInformationTableSearchDTO),
         service=Depends(get_layer_service)
 ) -> Response[LayerInformationTableDTO]:
-    return Response.correct(await service.get_table(layer_id))
+    return Response.correct(await service.get_table(layer_id, table_search_dto))
 
 
 @layer_router.post("/{layer_id}/filter/", response_model=Response[dict])
 async def filter_table(
         layer_id: str,
         filter_columns: dict = Body(...),
+        feature_search_dto: LayerFeatureSearchDTO = Depends(LayerFeatureSearchDTO),
+        accept: Optional[str] = Header(None),
         service=Depends(get_layer_service)
 ) -> Response[LayerInformationTableDTO]:
-    return Response.correct(await service.filter_table(layer_id, filter_columns))
+    output_format = service.get_export_format(accept)
+    if output_format:
+        content = await service.export_table(layer_id, filter_columns, output_format, feature_search_dto)
+        return export_response(content, output_format, layer_id)
+    return Response.correct(await service.filter_table(layer_id, filter_columns, feature_search_dto))
+
+
+@layer_router.post("/{layer_id}/filter/stream/")
+async def stream_filter_table(
+        layer_id: str,
+        filter_columns: dict = Body(...),
+        output_format: str = Query("geojson", alias="format"),
+        feature_search_dto: LayerFeatureSearchDTO = Depends(LayerFeatureSearchDTO),
+        service=Depends(get_layer_service)
+) -> StreamingResponse:
+    content = await service.stream_table(layer_id, filter_columns, output_format, feature_search_dto)
+    return StreamingResponse(content, media_type=STREAM_FORMATS[output_format])
 
 
 @layer_router.get("/{layer_id}/geojson/{row_id}", response_model=Response[dict])
 async def get_geojson(
         layer_id: str,
         row_id: str,
+        geometry_search_dto: LayerGeometrySearchDTO = Depends(LayerGeometrySearchDTO),
+        accept: Optional[str] = Header(None),
         service=Depends(get_layer_service)
 ) -> Response[dict]:
-    return Response.correct(await service.get_geojson(layer_id, row_id))
+    output_format = service.get_export_format(accept)
+    if output_format:
+        content = await service.export_geojson(layer_id, row_id, output_format, geometry_search_dto)
+        return export_response(content, output_format, row_id)
+    return Response.correct(await service.get_geojson(layer_id, row_id, geometry_search_dto))
+
+
+@layer_router.post("/{layer_id}/geojson/", response_model=Response[dict])
+async def get_geojson_many(
+        layer_id: str,
+        row_ids: list[str] = Body(...),
+        geometry_search_dto: LayerGeometrySearchDTO = Depends(LayerGeometrySearchDTO),
+        service=Depends(get_layer_service)
+) -> Response[dict]:
+    return Response.correct(await service.get_geojson_many(layer_id, row_ids, geometry_search_dto))
+
+
+@layer_router.get("/{layer_id}/tiles/{z}/{x}/{y}.mvt")
+async def get_tile(
+        layer_id: str,
+        z: int,
+        x: int,
+        y: int,
+        service=Depends(get_layer_service)
+) -> HttpResponse:
+    return HttpResponse(content=await service.get_tile(layer_id, z, x, y), media_type=MVT_MEDIA_TYPE)
 
 
 @layer_router.get("/{layer_id}/summary/", response_model=Response[dict])
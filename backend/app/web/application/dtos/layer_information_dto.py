@@ -1,3 +1,5 @@
+from typing import Optional
+
 from app.web.application.dtos.base_dto import BaseDTO
 
 
@@ -16,3 +18,23 @@ class LayerInformationTableDTO(BaseDTO):
     columns: list[dict] = []
     data: list[dict] = []
     filters: list[LayerInformationFilterDTO]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+class LayerInformationTableSearchDTO(BaseDTO):
+    cursor: Optional[str] = None
+    limit: Optional[int] = None
+    include_total: bool = False
+
+
+class LayerGeometrySearchDTO(BaseDTO):
+    zoom: Optional[float] = None
+    tolerance: Optional[float] = None
+    topology: bool = False
+    quantization: Optional[int] = None
+
+
+class LayerFeatureSearchDTO(LayerGeometrySearchDTO):
+    match: str = "exact"
+    bbox: Optional[str] = None
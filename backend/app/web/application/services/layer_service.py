@@ -1,30 +1,59 @@
-from typing import Optional
+import asyncio
+import json
+from typing import Optional, AsyncIterator
 
-import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
-from sklearn.linear_model import LinearRegression
+import geopandas as gpd
+import pandas as pd
 
+from app.config import settings
 from app.shared.domain.exceptions.application_exception import ApplicationException
+from app.shared.domain.utils.constants import LAYER_TABLE_MAX_PAGE_SIZE, LAYER_GEOJSON_MAX_BATCH_SIZE, \
+    ANALYTICS_KINDS, STREAM_FORMATS, STREAM_CHUNK_SIZE, FILTER_MATCH_MODES, EXPORT_FORMATS, TOPOJSON_QUANTIZATION, \
+    LAYER_GEOMETRY_LEVEL_PREFIX, MAP_TILE_SIZE, MVT_MAX_ZOOM
 from app.web.application.dtos.layer_dto import LayerSearchDTO, LayerDTO
 from app.web.application.dtos.layer_information_dto import LayerInformationTableDTO, LayerInformationFilterDTO, \
-    LayerInformationOptionDTO
+    LayerInformationOptionDTO, LayerInformationTableSearchDTO, LayerFeatureSearchDTO, \
+    LayerGeometrySearchDTO
 from app.web.domain.models.layer import Layer
-from app.web.domain.models.layer_information_table import LayerInformationTable
+from app.web.domain.models.layer_column_plan import LayerColumnPlan
+from app.web.domain.models.layer_information_table import LayerInformationTable, LayerInformationFilter, \
+    LayerInformationOption
+from app.web.domain.models.tendencies_settings import TendenciesSettings
 from app.web.domain.models.wms_layer import WmsLayer
 from app.web.domain.repositories.category_repository import CategoryRepository
+from app.web.domain.repositories.layer_analytics_repository import LayerAnalyticsRepository
 from app.web.domain.repositories.layer_information_repository import LayerInformationRepository
 from app.web.domain.repositories.layer_repository import LayerRepository
+from app.web.domain.repositories.layer_tile_repository import LayerTileRepository
 from app.web.domain.repositories.wms_layer_repository import WmsLayerRepository
+from app.web.infrastructure.analytics.tendencies_engine import tendencies_engine
+from app.web.infrastructure.cache.layer_column_plan_cache import layer_column_plan_cache
+from app.web.infrastructure.cache.layer_tile_cache import layer_tile_cache
+from app.web.infrastructure.export.feature_encoder import encode_features, encode_topology
+
+# Capas configuradas antes de guardar la configuración de tendencias junto a sus columnas.
+LEGACY_TENDENCIES_SETTINGS = {
+    "geo_suelo_urbano": {
+        "x_column": "ÁREA_(ha)",
+        "y_column": "VIVIENDAS",
+        "feature_columns": ["BENEFICIAR"],
+        "label": "Regresión: Área vs Viviendas",
+    }
+}
 
 
 class LayerService:
+    __refreshing: set[tuple] = set()
+
     def __init__(self, layer_repository: LayerRepository, wms_layer_repository: WmsLayerRepository,
-                 category_repository: CategoryRepository, layer_information_repository: LayerInformationRepository):
+                 category_repository: CategoryRepository, layer_information_repository: LayerInformationRepository,
+                 layer_analytics_repository: LayerAnalyticsRepository, layer_tile_repository: LayerTileRepository):
         self.layer_repository = layer_repository
         self.wms_layer_repository = wms_layer_repository
         self.category_repository = category_repository
         self.layer_information_repository = layer_information_repository
+        self.layer_analytics_repository = layer_analytics_repository
+        self.layer_tile_repository = layer_tile_repository
 
     async def get_by_id(self, layer_id: str) -> LayerDTO:
         layer: Optional[Layer] = await self.layer_repository.get(layer_id)
@@ -50,21 +79,31 @@ class LayerService:
     async def get_all(self, layer_search_dto: LayerSearchDTO) -> list[LayerDTO]:
         result: list[LayerDTO] = []
 
-        layers: list[Layer] = await self.layer_repository.get_all({
+        filters = {
             "category_id": layer_search_dto.category_id,
             "is_visible": True
-        })
+        }
 
-        for layer in layers:
-            category = await self.category_repository.get(layer.category_id)
-            if category:
-                category_name = category.name
-            else:
-                category_name = "Sin categoría"
+        # Las capas y las capas WMS son independientes: se consultan en paralelo.
+        layers: list[Layer]
+        wms_layers: list[WmsLayer]
+        if layer_search_dto.include_wms_layers:
+            layers, wms_layers = await asyncio.gather(
+                self.layer_repository.get_all(dict(filters)),
+                self.wms_layer_repository.get_all(dict(filters))
+            )
+        else:
+            layers, wms_layers = await self.layer_repository.get_all(filters), []
+
+        # Todas las categorías en una sola consulta.
+        categories = await self.category_repository.get_many(
+            [x.category_id for x in layers] + [x.category_id for x in wms_layers])
+        category_names = {category.id: category.name for category in categories}
 
+        for layer in layers:
             result.append(LayerDTO(
                 id=layer.id,
-                category_name=category_name,
+                category_name=category_names.get(layer.category_id, "Sin categoría"),
                 name=layer.view_name,
                 title=layer.name,
                 description=layer.description,
@@ -72,30 +111,22 @@ class LayerService:
                 download_url=layer.wfs_url
             ))
 
-        if layer_search_dto.include_wms_layers:
-            wms_layers: list[WmsLayer] = await self.wms_layer_repository.get_all({
-                "category_id": layer_search_dto.category_id,
-                "is_visible": True
-            })
-            for wms_layer in wms_layers:
-                category = await self.category_repository.get(wms_layer.category_id)
-                if category:
-                    category_name = category.name
-                else:
-                    category_name = "Sin categoría"
-
-                result.append(LayerDTO(
-                    id=wms_layer.id,
-                    category_name=category_name,
-                    name=wms_layer.code,
-                    title=wms_layer.name,
-                    description="WMS",
-                    url=wms_layer.url
-                ))
+        for wms_layer in wms_layers:
+            result.append(LayerDTO(
+                id=wms_layer.id,
+                category_name=category_names.get(wms_layer.category_id, "Sin categoría"),
+                name=wms_layer.code,
+                title=wms_layer.name,
+                description="WMS",
+                url=wms_layer.url
+            ))
 
         return result
 
-    async def get_geojson(self, layer_id: str, row_id: str) -> dict:
+    async def get_geojson(self, layer_id: str, row_id: str,
+                          geometry_search_dto: Optional[LayerGeometrySearchDTO] = None) -> dict:
+        geometry_search_dto = geometry_search_dto or LayerGeometrySearchDTO()
+
         layer: Optional[Layer] = await self.layer_repository.get(layer_id)
         if not layer:
             raise ApplicationException("No se ha encontrado la capa solicitada")
@@ -104,28 +135,64 @@ class LayerService:
         if not columns:
             raise ApplicationException("No se ha encontrado información de columnas para la capa solicitada")
 
-        row = await self.layer_information_repository.get_geojson(layer.layer_information_name, row_id)
+        if geometry_search_dto.topology:
+            column_plan = self.__get_column_plan(columns)
+            frame = await self.layer_information_repository.get_geojson_frame(
+                layer.layer_information_name,
+                row_id,
+                column_plan.projection,
+                self.__get_geometry_field(columns, geometry_search_dto)
+            )
+            if frame.empty:
+                raise ApplicationException("No se ha encontrado información geográfica para la capa solicitada")
+            return await self.__encode_topology(frame, column_plan, geometry_search_dto)
+
+        row = await self.layer_information_repository.get_geojson(
+            layer.layer_information_name, row_id, self.__get_geometry_field(columns, geometry_search_dto))
         if not row:
             raise ApplicationException("No se ha encontrado información geográfica para la capa solicitada")
 
-        allowed_columns = [
-            base for base in columns['columns']
-            if columns['columns_status'].get(base, False)
-        ]
+        return self.__rename_properties(row, self.__get_column_plan(columns))
+
+    async def get_geojson_many(self, layer_id: str, row_ids: list[str],
+                               geometry_search_dto: Optional[LayerGeometrySearchDTO] = None) -> dict:
+        geometry_search_dto = geometry_search_dto or LayerGeometrySearchDTO()
+        # Sin duplicados y conservando el orden de selección.
+        row_ids = list(dict.fromkeys(row_ids))
+        if not row_ids:
+            raise ApplicationException("Debe indicar al menos una fila")
+        if len(row_ids) > LAYER_GEOJSON_MAX_BATCH_SIZE:
+            raise ApplicationException(
+                f"No se pueden solicitar más de {LAYER_GEOJSON_MAX_BATCH_SIZE} filas a la vez")
+
+        # Una sola lectura de la capa y de sus columnas para todas las filas.
+        layer, columns = await self.__get_layer_with_columns(layer_id)
+
+        rows = await self.layer_information_repository.get_geojson_many(
+            layer.layer_information_name, row_ids, self.__get_geometry_field(columns, geometry_search_dto))
 
-        for feature in row.get("features", []):
+        return self.__rename_properties(rows, self.__get_column_plan(columns))
+
+    @staticmethod
+    def __rename_properties(rows: dict, column_plan: LayerColumnPlan) -> dict:
+        for feature in rows.get("features", []):
             properties = feature.get("properties", {})
-            for property in list(properties.keys()):
-                if property in allowed_columns:
-                    new_name = columns['columns_with_prefix'][columns['columns'].index(property)]
-                    properties[new_name] = properties.pop(property)
-                else:
-                    # Si no está permitido, lo eliminamos
-                    properties.pop(property)
+            # Solo las columnas permitidas, con su nombre con prefijo; las demás se eliminan.
+            feature["properties"] = {
+                column_plan.names[property]: value
+                for property, value in properties.items()
+                if property in column_plan.allowed
+            }
+
+        return rows
 
-        return row
+    async def get_table(self, layer_id: str,
+                        table_search_dto: Optional[LayerInformationTableSearchDTO] = None) -> LayerInformationTableDTO:
+        table_search_dto = table_search_dto or LayerInformationTableSearchDTO()
+        if table_search_dto.limit is not None and table_search_dto.limit <= 0:
+            raise ApplicationException("El tamaño de página debe ser mayor a cero")
+        limit = min(table_search_dto.limit, LAYER_TABLE_MAX_PAGE_SIZE) if table_search_dto.limit else None
 
-    async def get_table(self, layer_id: str) -> LayerInformationTableDTO:
         layer: Optional[Layer] = await self.layer_repository.get(layer_id)
         if not layer:
             raise ApplicationException("No se ha encontrado la capa solicitada")
@@ -134,50 +201,53 @@ class LayerService:
         if not columns:
             raise ApplicationException("No se ha encontrado información de columnas para la capa solicitada")
 
-        table_information: Optional[LayerInformationTable] = await self.layer_information_repository.get_table(
-            layer.layer_information_name)
-        if not table_information:
-            raise ApplicationException("No se ha encontrado información tabular para la capa solicitada")
-
-        # 1) Construye la lista filtrada con mapeo
-        columns_with_mapping = [
-            {
-                "name": pref,  # columna con prefijo (header)
-                "original": base  # columna real (dato)
-            }
-            for base, pref in zip(columns['columns'], columns['columns_with_prefix'])
-            if columns['columns_status'].get(base, False)
-        ]
-
-        # 2) Lista de columnas originales permitidas
-        allowed_original_columns = [c["original"] for c in columns_with_mapping]
+        column_plan = self.__get_column_plan(columns)
 
-        # 3) Recorta cada fila de data a solo esas columnas
-        filtered_data = []
-        for row in table_information.data:
-            filtered_row = {key: row[key] for key in allowed_original_columns if key in row}
-            if '_id' in row:
-                filtered_row['_id'] = row['_id']
-            filtered_data.append(filtered_row)
+        if limit or table_search_dto.cursor:
+            # La paginación se resuelve en MongoDB para no materializar la capa completa.
+            table_information: Optional[LayerInformationTable] = await self.layer_information_repository.get_table(
+                layer.layer_information_name,
+                column_plan.projection,
+                cursor=table_search_dto.cursor,
+                limit=limit,
+                include_total=table_search_dto.include_total
+            )
+            if not table_information:
+                raise ApplicationException("No se ha encontrado información tabular para la capa solicitada")
+        else:
+            snapshot = await self.__get_snapshot(layer, columns, column_plan)
+            data = self.__to_records(snapshot)
+            table_information = LayerInformationTable(
+                columns=list(snapshot.columns),
+                data=data,
+                total=len(data) if table_search_dto.include_total else None
+            )
 
-        # Los filtros también necesitan analogía.
-        base_to_pref = {c["original"]: c["name"] for c in columns_with_mapping}
+        filters = await self.__get_filters(layer, columns, column_plan)
 
         # 4) Devuelve todo listo
         return LayerInformationTableDTO(
-            columns=columns_with_mapping,
-            data=filtered_data,
+            columns=column_plan.columns_with_mapping,
+            data=table_information.data,
             filters=[
                 LayerInformationFilterDTO(
-                    label=base_to_pref.get(x.name, x.name),
+                    label=column_plan.names.get(x.name, x.name),
                     name=x.name,
                     options=[LayerInformationOptionDTO(id=label.id, label=label.label) for label in x.options]
                 )
-                for x in table_information.filters
-            ]
+                for x in filters
+            ],
+            next_cursor=table_information.next_cursor,
+            total=table_information.total
         )
 
-    async def filter_table(self, layer_id: str, filter_columns: dict) -> dict:
+    async def filter_table(self, layer_id: str, filter_columns: dict,
+                           feature_search_dto: Optional[LayerFeatureSearchDTO] = None) -> dict:
+        feature_search_dto = feature_search_dto or LayerFeatureSearchDTO()
+        if feature_search_dto.match not in FILTER_MATCH_MODES:
+            raise ApplicationException("El modo de búsqueda solicitado no es válido")
+        bbox = self.__parse_bbox(feature_search_dto.bbox)
+
         layer: Optional[Layer] = await self.layer_repository.get(layer_id)
         if not layer:
             raise ApplicationException("No se ha encontrado la capa solicitada")
@@ -186,67 +256,215 @@ class LayerService:
         if not columns:
             raise ApplicationException("No se ha encontrado información de columnas para la capa solicitada")
 
+        column_plan = self.__get_column_plan(columns)
+        if feature_search_dto.topology:
+            frame = await self.layer_information_repository.get_features_frame(
+                layer.layer_information_name,
+                filter_columns,
+                column_plan.projection,
+                feature_search_dto.match,
+                bbox,
+                self.__get_geometry_field(columns, feature_search_dto)
+            )
+            return await self.__encode_topology(frame, column_plan, feature_search_dto)
+
         results = await self.layer_information_repository.get_geometry_and_table(
-            layer.layer_information_name, filter_columns)
+            layer.layer_information_name, filter_columns, column_plan.projection, feature_search_dto.match, bbox,
+            self.__get_geometry_field(columns, feature_search_dto))
 
         return results
 
-    async def get_summary(self, layer_id: str) -> dict:
-        layer: Optional[Layer] = await self.layer_repository.get(layer_id)
-        if not layer:
-            raise ApplicationException("No se ha encontrado la capa solicitada")
-
-        columns = await self.layer_information_repository.get_columns(layer.layer_information_name)
-        if not columns:
-            raise ApplicationException("No se ha encontrado información de columnas para la capa solicitada")
-
-        table_information: Optional[LayerInformationTable] = await self.layer_information_repository.get_table(
-            layer.layer_information_name)
-        if not table_information:
-            raise ApplicationException("No se ha encontrado información tabular para la capa solicitada")
+    async def stream_table(self, layer_id: str, filter_columns: dict, output_format: str,
+                           feature_search_dto: Optional[LayerFeatureSearchDTO] = None) -> AsyncIterator[bytes]:
+        feature_search_dto = feature_search_dto or LayerFeatureSearchDTO()
+        if output_format not in STREAM_FORMATS:
+            raise ApplicationException("El formato de salida solicitado no es válido")
+        if feature_search_dto.match not in FILTER_MATCH_MODES:
+            raise ApplicationException("El modo de búsqueda solicitado no es válido")
+        bbox = self.__parse_bbox(feature_search_dto.bbox)
+
+        # La capa se valida antes de empezar a transmitir: luego ya no se puede cambiar el estado HTTP.
+        layer, columns = await self.__get_layer_with_columns(layer_id)
+        geometry_field = self.__get_geometry_field(columns, feature_search_dto)
+
+        features = self.layer_information_repository.iter_features(
+            layer.layer_information_name, filter_columns, self.__get_column_plan(columns).projection,
+            feature_search_dto.match, bbox, geometry_field)
+        if output_format == "ndjson":
+            return self.__encode_ndjson(features)
+        return self.__encode_feature_collection(features)
+
+    @staticmethod
+    def __parse_bbox(bbox: Optional[str]) -> Optional[tuple[float, float, float, float]]:
+        if not bbox:
+            return None
+
+        # Formato "minx,miny,maxx,maxy" en grados (EPSG:4326), como el BBOX de WMS.
+        try:
+            min_x, min_y, max_x, max_y = (float(value) for value in bbox.split(","))
+        except ValueError:
+            raise ApplicationException("La extensión solicitada no es válida")
+
+        if not (-180 <= min_x < max_x <= 180 and -90 <= min_y < max_y <= 90):
+            raise ApplicationException("La extensión solicitada no es válida")
+
+        return min_x, min_y, max_x, max_y
+
+    @staticmethod
+    def __get_geometry_field(columns: dict, geometry_search_dto: LayerGeometrySearchDTO) -> Optional[str]:
+        if geometry_search_dto.tolerance is not None:
+            if geometry_search_dto.tolerance < 0:
+                raise ApplicationException("La tolerancia solicitada no es válida")
+            tolerance = geometry_search_dto.tolerance
+        elif geometry_search_dto.zoom is not None:
+            if not 0 <= geometry_search_dto.zoom <= MVT_MAX_ZOOM:
+                raise ApplicationException("El nivel de zoom solicitado no es válido")
+            # Tamaño de un píxel en grados para el zoom pedido: no tiene sentido enviar más detalle.
+            tolerance = 360 / (MAP_TILE_SIZE * 2 ** geometry_search_dto.zoom)
+        else:
+            return None
+
+        # Niveles ordenados del más grueso al más fino: se usa el primero que no supera la tolerancia.
+        for index, level_tolerance in enumerate(columns.get("geometry_levels", [])):
+            if level_tolerance <= tolerance:
+                return f"{LAYER_GEOMETRY_LEVEL_PREFIX}{index}"
+
+        return None
+
+    async def export_table(self, layer_id: str, filter_columns: dict, output_format: str,
+                           feature_search_dto: Optional[LayerFeatureSearchDTO] = None) -> bytes:
+        feature_search_dto = feature_search_dto or LayerFeatureSearchDTO()
+        if output_format not in EXPORT_FORMATS:
+            raise ApplicationException("El formato de salida solicitado no es válido")
+        if feature_search_dto.match not in FILTER_MATCH_MODES:
+            raise ApplicationException("El modo de búsqueda solicitado no es válido")
+        bbox = self.__parse_bbox(feature_search_dto.bbox)
+
+        layer, columns = await self.__get_layer_with_columns(layer_id)
+        column_plan = self.__get_column_plan(columns)
+
+        frame = await self.layer_information_repository.get_features_frame(
+            layer.layer_information_name,
+            filter_columns,
+            column_plan.projection,
+            feature_search_dto.match,
+            bbox,
+            self.__get_geometry_field(columns, feature_search_dto)
+        )
+        return await self.__encode_frame(frame, column_plan, output_format)
+
+    async def export_geojson(self, layer_id: str, row_id: str, output_format: str,
+                             geometry_search_dto: Optional[LayerGeometrySearchDTO] = None) -> bytes:
+        geometry_search_dto = geometry_search_dto or LayerGeometrySearchDTO()
+        if output_format not in EXPORT_FORMATS:
+            raise ApplicationException("El formato de salida solicitado no es válido")
+
+        layer, columns = await self.__get_layer_with_columns(layer_id)
+        column_plan = self.__get_column_plan(columns)
+
+        frame = await self.layer_information_repository.get_geojson_frame(
+            layer.layer_information_name,
+            row_id,
+            column_plan.projection,
+            self.__get_geometry_field(columns, geometry_search_dto)
+        )
+        if frame.empty:
+            raise ApplicationException("No se ha encontrado información geográfica para la capa solicitada")
+        return await self.__encode_frame(frame, column_plan, output_format)
+
+    @staticmethod
+    def get_export_format(accept: Optional[str]) -> Optional[str]:
+        # Negociación por cabecera Accept: sin un tipo binario conocido se responde en JSON.
+        media_types = [media_type.split(";")[0].strip() for media_type in (accept or "").split(",")]
+        for media_type in media_types:
+            for output_format, (export_media_type, _) in EXPORT_FORMATS.items():
+                if media_type == export_media_type:
+                    return output_format
+        return None
+
+    @staticmethod
+    async def __encode_topology(frame: gpd.GeoDataFrame, column_plan: LayerColumnPlan,
+                                geometry_search_dto: LayerGeometrySearchDTO) -> dict:
+        quantization = geometry_search_dto.quantization or TOPOJSON_QUANTIZATION
+        if quantization < 2:
+            raise ApplicationException("La cuantización solicitada no es válida")
+
+        frame = frame.rename(columns=column_plan.names)
+        # Construir la topología es intensivo en CPU: no debe bloquear el bucle de eventos.
+        return await asyncio.to_thread(encode_topology, frame, quantization)
+
+    @staticmethod
+    async def __encode_frame(frame: gpd.GeoDataFrame, column_plan: LayerColumnPlan, output_format: str) -> bytes:
+        frame = frame.rename(columns=column_plan.names)
+        # La codificación binaria es intensiva en CPU: no debe bloquear el bucle de eventos.
+        return await asyncio.to_thread(encode_features, frame, output_format)
+
+    @staticmethod
+    async def __encode_feature_collection(features: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+        buffer = ['{"type": "FeatureCollection", "features": [']
+        size = 0
+        separator = ""
+        async for feature in features:
+            chunk = separator + json.dumps(feature, default=str, ensure_ascii=False)
+            buffer.append(chunk)
+            size += len(chunk)
+            separator = ","
+            if size >= STREAM_CHUNK_SIZE:
+                yield "".join(buffer).encode("utf-8")
+                buffer, size = [], 0
+        buffer.append("]}")
+        yield "".join(buffer).encode("utf-8")
+
+    @staticmethod
+    async def __encode_ndjson(features: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+        buffer = []
+        size = 0
+        async for feature in features:
+            chunk = json.dumps(feature, default=str, ensure_ascii=False) + "\n"
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= STREAM_CHUNK_SIZE:
+                yield "".join(buffer).encode("utf-8")
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer).encode("utf-8")
+
+    async def get_tile(self, layer_id: str, z: int, x: int, y: int) -> bytes:
+        if not 0 <= z <= MVT_MAX_ZOOM or not 0 <= x < 2 ** z or not 0 <= y < 2 ** z:
+            raise ApplicationException("La tesela solicitada no es válida")
+
+        layer, columns = await self.__get_layer_with_columns(layer_id)
+
+        # La vista de PostGIS expone cada columna como F_<columna>; se publican con su nombre actual.
+        tile_columns = {f"F_{base}": pref for base, pref in self.__get_column_plan(columns).names.items()}
+
+        async def load() -> bytes:
+            return await self.layer_tile_repository.get_tile(
+                layer.schema_name, layer.view_name, tile_columns, z, x, y)
+
+        return await layer_tile_cache.get(
+            layer.layer_information_name, columns.get("version") or "0", z, x, y, load)
 
-        # 1) Construye la lista filtrada con mapeo
-        columns_with_mapping = [
-            {
-                "name": pref,  # nombre legible (prefijo)
-                "original": base  # columna real
-            }
-            for base, pref in zip(columns['columns'], columns['columns_with_prefix'])
-            if columns['columns_status'].get(base, False)
-        ]
+    async def get_summary(self, layer_id: str) -> dict:
+        layer, columns = await self.__get_layer_with_columns(layer_id)
+        return await self.__get_analytics(layer, columns, "summary")
 
-        allowed_original_columns = [c["original"] for c in columns_with_mapping]
+    async def __compute_summary(self, layer: Layer, columns: dict) -> dict:
+        column_plan = self.__get_column_plan(columns)
 
-        # 2) Filtra data
-        filtered_data = []
-        for row in table_information.data:
-            filtered_row = {key: row[key] for key in allowed_original_columns if key in row}
-            if '_id' in row:
-                filtered_row['_id'] = row['_id']
-            filtered_data.append(filtered_row)
+        filters = await self.__get_filters(layer, columns, column_plan)
+        value_counts = await self.__get_value_counts(layer, columns, column_plan, filters)
 
         # 3) Para cada filtro, calcula número único
         summaries = []
 
-        for filter_def in table_information.filters:
+        for filter_def in filters:
             filter_column = filter_def.name
 
             # Busca prefijo legible
-            display_name = next(
-                (c["name"] for c in columns_with_mapping if c["original"] == filter_column),
-                filter_column
-            )
-
-            unique_values = set()
-            for row in filtered_data:
-                value = row.get(filter_column)
-                if value is None:
-                    continue
-                if isinstance(value, str):
-                    value = value.strip()
-                unique_values.add(value)
+            display_name = column_plan.names.get(filter_column, filter_column)
 
-            count = len(unique_values)
+            count = len(value_counts[filter_column])
 
             summaries.append({
                 "name": display_name,
@@ -259,64 +477,28 @@ class LayerService:
         }
 
     async def get_graphs(self, layer_id: str) -> dict:
-        layer: Optional[Layer] = await self.layer_repository.get(layer_id)
-        if not layer:
-            raise ApplicationException("No se ha encontrado la capa solicitada")
+        layer, columns = await self.__get_layer_with_columns(layer_id)
+        return await self.__get_analytics(layer, columns, "graphs")
 
-        columns = await self.layer_information_repository.get_columns(layer.layer_information_name)
-        if not columns:
-            raise ApplicationException("No se ha encontrado información de columnas para la capa solicitada")
-
-        table_information: Optional[LayerInformationTable] = await self.layer_information_repository.get_table(
-            layer.layer_information_name)
-        if not table_information:
-            raise ApplicationException("No se ha encontrado información tabular para la capa solicitada")
-
-        # 1) Construye la lista filtrada con mapeo
-        columns_with_mapping = [
-            {
-                "name": pref,  # columna con prefijo (header)
-                "original": base  # columna real (dato)
-            }
-            for base, pref in zip(columns['columns'], columns['columns_with_prefix'])
-            if columns['columns_status'].get(base, False)
-        ]
+    async def __compute_graphs(self, layer: Layer, columns: dict) -> dict:
+        column_plan = self.__get_column_plan(columns)
 
-        # 2) Lista de columnas originales permitidas
-        allowed_original_columns = [c["original"] for c in columns_with_mapping]
-
-        # 3) Recorta cada fila de data a solo esas columnas
-        filtered_data = []
-        for row in table_information.data:
-            filtered_row = {key: row[key] for key in allowed_original_columns if key in row}
-            if '_id' in row:
-                filtered_row['_id'] = row['_id']
-            filtered_data.append(filtered_row)
+        filters = await self.__get_filters(layer, columns, column_plan)
+        value_counts = await self.__get_value_counts(layer, columns, column_plan, filters)
 
         # 3) Para cada filtro, agrupa y arma gráfico
         graphs = []
-        for filter_def in table_information.filters:
+        for filter_def in filters:
             filter_column = filter_def.name  # nombre real de la columna
 
-            # 1) Busca el nombre bonito (prefijo)
-            display_name = next(
-                (c["name"] for c in columns_with_mapping if c["original"] == filter_column),
-                filter_column  # fallback: usa el real si no lo encuentra
-            )
-
-            counts = {}
+            # 1) Busca el nombre bonito (prefijo); si no lo encuentra usa el real
+            display_name = column_plan.names.get(filter_column, filter_column)
 
-            # 2) Agrupa
-            for row in filtered_data:
-                value = row.get(filter_column)
-                if value is None:
-                    continue
-                if isinstance(value, str):
-                    value = value.strip()
-                counts[value] = counts.get(value, 0) + 1
+            # 2) Agrupa (respeta el orden de aparición de cada valor)
+            counts = value_counts[filter_column]
 
-            labels = list(counts.keys())
-            data = list(counts.values())
+            labels = [value for value, _ in counts]
+            data = [count for _, count in counts]
 
             chart = {
                 "title": f"Distribución por {display_name}",
@@ -337,6 +519,83 @@ class LayerService:
         }
 
     async def get_tendencies(self, layer_id: str) -> dict:
+        layer, columns = await self.__get_layer_with_columns(layer_id)
+        result = await self.__get_analytics(layer, columns, "tendencies")
+        if not result:
+            return result
+
+        # Solo se materializan los modelos; la tabla se arma desde el snapshot en memoria.
+        column_plan = self.__get_column_plan(columns)
+        snapshot = await self.__get_snapshot(layer, columns, column_plan)
+        return {
+            "columns": column_plan.columns_with_mapping,
+            "data": self.__to_records(snapshot),
+            "tendencies": result["tendencies"]
+        }
+
+    async def __compute_tendencies(self, layer: Layer, columns: dict) -> dict:
+        column_plan = self.__get_column_plan(columns)
+
+        snapshot = await self.__get_snapshot(layer, columns, column_plan)
+
+        tendencies_settings = self.__get_tendencies_settings(layer, columns)
+        if not tendencies_settings:
+            return {}
+
+        axes = [tendencies_settings.x_column, tendencies_settings.y_column]
+        feature_columns = list(dict.fromkeys([*axes, *tendencies_settings.feature_columns]))
+        models = tendencies_settings.models
+
+        # El snapshot solo tiene columnas visibles: se omiten los modelos que necesitan una columna oculta.
+        if any(column not in snapshot for column in axes):
+            return {"tendencies": []}
+        if any(column not in snapshot for column in feature_columns):
+            feature_columns = list(dict.fromkeys(axes))
+            models = [model for model in models if model == "regression"]
+
+        numbers = pd.DataFrame({column: self.__to_numbers(snapshot, column) for column in feature_columns})
+
+        # Filas con todos los valores numéricos válidos (y positivos en los ejes, si así se configuró).
+        valid = numbers.notna().all(axis=1)
+        if tendencies_settings.positive_only:
+            valid &= (numbers[tendencies_settings.x_column] > 0) & (numbers[tendencies_settings.y_column] > 0)
+        numbers = numbers[valid]
+
+        label = tendencies_settings.label or "Regresión: {} vs {}".format(
+            column_plan.names.get(tendencies_settings.x_column, tendencies_settings.x_column),
+            column_plan.names.get(tendencies_settings.y_column, tendencies_settings.y_column)
+        )
+
+        tendencies = await tendencies_engine.fit(
+            (layer.layer_information_name, columns.get("version")),
+            numbers[[tendencies_settings.x_column]].to_numpy(),
+            numbers[tendencies_settings.y_column].to_numpy(),
+            numbers.to_numpy(),  # Para clustering y PCA
+            models,
+            tendencies_settings.n_clusters,
+            label
+        )
+
+        return {"tendencies": tendencies}
+
+    async def refresh_analytics(self, layer_id: str) -> None:
+        layer, columns = await self.__get_layer_with_columns(layer_id)
+
+        # Evita recalcular en paralelo la misma versión de la capa.
+        key = (layer.layer_information_name, columns.get("version"))
+        if key in LayerService.__refreshing:
+            return
+
+        LayerService.__refreshing.add(key)
+        try:
+            for kind in ANALYTICS_KINDS:
+                result = await self.__compute_analytics(layer, columns, kind)
+                await self.layer_analytics_repository.save(
+                    layer.layer_information_name, columns.get("version"), kind, result)
+        finally:
+            LayerService.__refreshing.discard(key)
+
+    async def __get_layer_with_columns(self, layer_id: str) -> tuple[Layer, dict]:
         layer: Optional[Layer] = await self.layer_repository.get(layer_id)
         if not layer:
             raise ApplicationException("No se ha encontrado la capa solicitada")
@@ -345,100 +604,93 @@ class LayerService:
         if not columns:
             raise ApplicationException("No se ha encontrado información de columnas para la capa solicitada")
 
-        table_information: Optional[LayerInformationTable] = await self.layer_information_repository.get_table(
-            layer.layer_information_name)
-        if not table_information:
+        return layer, columns
+
+    async def __get_analytics(self, layer: Layer, columns: dict, kind: str) -> dict:
+        # Los resultados son deterministas para una versión de la capa: se leen materializados.
+        result = await self.layer_analytics_repository.get(layer.layer_information_name, columns.get("version"), kind)
+        if result is not None:
+            return result
+
+        result = await self.__compute_analytics(layer, columns, kind)
+        await self.layer_analytics_repository.save(layer.layer_information_name, columns.get("version"), kind, result)
+        return result
+
+    async def __compute_analytics(self, layer: Layer, columns: dict, kind: str) -> dict:
+        if kind == "summary":
+            return await self.__compute_summary(layer, columns)
+        if kind == "graphs":
+            return await self.__compute_graphs(layer, columns)
+        return await self.__compute_tendencies(layer, columns)
+
+    async def __get_snapshot(self, layer: Layer, columns: dict, column_plan: LayerColumnPlan) -> pd.DataFrame:
+        snapshot = await self.layer_information_repository.get_snapshot(
+            layer.layer_information_name,
+            columns.get("version"),
+            column_plan.projection
+        )
+        if snapshot.empty:
             raise ApplicationException("No se ha encontrado información tabular para la capa solicitada")
+        return snapshot
 
-        # 1) Construye la lista filtrada con mapeo
-        columns_with_mapping = [
-            {
-                "name": pref,  # columna con prefijo (header)
-                "original": base  # columna real (dato)
-            }
-            for base, pref in zip(columns['columns'], columns['columns_with_prefix'])
-            if columns['columns_status'].get(base, False)
-        ]
+    async def __get_value_counts(self, layer: Layer, columns: dict, column_plan: LayerColumnPlan,
+                                 filters: list[LayerInformationFilter]) -> dict[str, list[tuple]]:
+        filter_columns = [x.name for x in filters]
 
-        # 2) Lista de columnas originales permitidas
-        allowed_original_columns = [c["original"] for c in columns_with_mapping]
-
-        # 3) Recorta cada fila de data a solo esas columnas
-        filtered_data = []
-        for row in table_information.data:
-            filtered_row = {key: row[key] for key in allowed_original_columns if key in row}
-            if '_id' in row:
-                filtered_row['_id'] = row['_id']
-            filtered_data.append(filtered_row)
-
-        tendencies = []
-
-        if layer.layer_information_name == "geo_suelo_urbano":
-            X_area = []
-            Y_viviendas = []
-            X_features = []  # Para clustering y PCA
-
-            for row in filtered_data:
-                try:
-                    area = float(row.get("ÁREA_(ha)", 0) or 0)
-                    viviendas = int(row.get("VIVIENDAS", 0) or 0)
-                    beneficiarios = int(row.get("BENEFICIAR", 0) or 0)
-                    if area > 0 and viviendas > 0:
-                        X_area.append([area])
-                        Y_viviendas.append(viviendas)
-                        X_features.append([area, viviendas, beneficiarios])
-                except (TypeError, ValueError):
-                    pass
-
-            if len(X_area) >= 2:
-                # Regresión lineal
-                lr = LinearRegression()
-                lr.fit(X_area, Y_viviendas)
-
-                # Línea de tendencia
-                x_min, x_max = min(X_area)[0], max(X_area)[0]
-                x_line = np.linspace(x_min, x_max, 10).reshape(-1, 1)
-                y_line = lr.predict(x_line)
-
-                regression_result = {
-                    "label": "Regresión: Área vs Viviendas",
-                    "data": [{"x": float(x), "y": float(y)} for x, y in zip(x_line.flatten(), y_line)],
-                    "original_data": [{"x": float(x[0]), "y": float(y)} for x, y in zip(X_area, Y_viviendas)],
-                    "borderColor": "#FF5722",
-                    "type": "line"
-                }
-                tendencies.append(regression_result)
-
-            if len(X_features) >= 2:
-                # 2) Clustering KMeans (2 clusters)
-                kmeans = KMeans(n_clusters=2, random_state=42)
-                clusters = kmeans.fit_predict(X_features)
-
-                cluster_result = {
-                    "label": "Clusters",
-                    "data": [{"x": float(a), "y": float(v), "cluster": int(c)}
-                             for (a, v, _), c in zip(X_features, clusters)],
-                    "type": "scatter",
-                    "backgroundColor": ["#4CAF50" if c == 0 else "#2196F3" for c in clusters]
-                }
-                tendencies.append(cluster_result)
-
-                # 3) PCA
-                pca = PCA(n_components=2)
-                pca_coords = pca.fit_transform(X_features)
-                pca_result = {
-                    "label": "PCA",
-                    "data": [{"x": float(x), "y": float(y)} for x, y in pca_coords],
-                    "type": "scatter",
-                    "backgroundColor": "#9C27B0"
-                }
-                tendencies.append(pca_result)
-
-            return {
-                "columns": columns_with_mapping,
-                "data": filtered_data,
-                "tendencies": tendencies
-            }
+        if settings.LAYER_ANALYTICS_SOURCE == "aggregation":
+            return await self.layer_information_repository.get_value_counts(
+                layer.layer_information_name, filter_columns)
 
-        else:
-            return {}
+        snapshot = await self.__get_snapshot(layer, columns, column_plan)
+        result = {}
+        for filter_column in filter_columns:
+            counts = self.__strip_values(snapshot[filter_column]).value_counts(sort=False)
+            result[filter_column] = list(zip(counts.index.tolist(), counts.tolist()))
+        return result
+
+    @staticmethod
+    def __get_tendencies_settings(layer: Layer, columns: dict) -> Optional[TendenciesSettings]:
+        tendencies_settings = columns.get("tendencies") or LEGACY_TENDENCIES_SETTINGS.get(layer.layer_information_name)
+        if not tendencies_settings:
+            return None
+        return TendenciesSettings(**tendencies_settings)
+
+    @staticmethod
+    def __to_records(snapshot: pd.DataFrame) -> list[dict]:
+        return snapshot.astype(object).where(snapshot.notna(), None).to_dict(orient="records")
+
+    @staticmethod
+    def __strip_values(values: pd.Series) -> pd.Series:
+        values = values.dropna()
+        # Solo se recortan los textos; los demás valores se conservan tal cual.
+        if pd.api.types.infer_dtype(values, skipna=True) in ("string", "mixed", "mixed-integer"):
+            return values.str.strip().fillna(values)
+        return values
+
+    @staticmethod
+    def __to_numbers(snapshot: pd.DataFrame, column: str) -> pd.Series:
+        values = snapshot[column]
+        # Los vacíos cuentan como cero; los textos no numéricos quedan como NaN.
+        missing = values.isna() | (values == "")
+        return pd.to_numeric(values.mask(missing, 0), errors="coerce")
+
+    async def __get_filters(self, layer: Layer, columns: dict,
+                            column_plan: LayerColumnPlan) -> list[LayerInformationFilter]:
+        # Capas registradas antes de perfilar columnas en la ingesta: se calculan en MongoDB.
+        if columns.get("filters") is None:
+            return await self.layer_information_repository.get_filters(
+                layer.layer_information_name, column_plan.projection)
+
+        return [
+            LayerInformationFilter(
+                name=x["name"],
+                options=[LayerInformationOption(id=option, label=option) for option in x["options"]]
+            )
+            for x in columns["filters"]
+            if x["name"] in column_plan.allowed
+        ]
+
+    @staticmethod
+    def __get_column_plan(columns: dict) -> LayerColumnPlan:
+        # Compilado una vez por versión de layer_columns y reutilizado entre peticiones.
+        return layer_column_plan_cache.get(columns)
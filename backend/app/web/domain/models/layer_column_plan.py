@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+
+
+class LayerColumnPlan(BaseModel):
+    # Columnas habilitadas en el orden del documento layer_columns.
+    projection: list[str] = []
+    allowed: frozenset[str] = frozenset()
+    # Columna real -> columna con prefijo (header).
+    names: dict[str, str] = {}
+
+    @classmethod
+    def from_columns(cls, columns: dict) -> "LayerColumnPlan":
+        names = {
+            base: pref
+            for base, pref in zip(columns['columns'], columns['columns_with_prefix'])
+            if columns['columns_status'].get(base, False)
+        }
+        return cls(projection=list(names), allowed=frozenset(names), names=names)
+
+    @property
+    def columns_with_mapping(self) -> list[dict]:
+        return [
+            {
+                "name": pref,  # columna con prefijo (header)
+                "original": base  # columna real (dato)
+            }
+            for base, pref in self.names.items()
+        ]
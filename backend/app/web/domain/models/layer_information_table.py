@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
@@ -14,4 +16,6 @@ class LayerInformationFilter(BaseModel):
 class LayerInformationTable(BaseModel):
     columns: list[str] = []
     data: list[dict] = []
-    filters: list[LayerInformationFilter]
+    filters: list[LayerInformationFilter] = []
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
@@ -0,0 +1,13 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class TendenciesSettings(BaseModel):
+    x_column: str
+    y_column: str
+    feature_columns: list[str] = []
+    models: list[str] = ["regression", "clusters", "pca"]
+    n_clusters: int = 2
+    positive_only: bool = True
+    label: Optional[str] = None
@@ -0,0 +1,12 @@
+from abc import abstractmethod, ABC
+from typing import Optional
+
+
+class LayerAnalyticsRepository(ABC):
+    @abstractmethod
+    async def get(self, code: str, version: Optional[str], kind: str) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    async def save(self, code: str, version: Optional[str], kind: str, result: dict) -> None:
+        pass
@@ -1,19 +1,59 @@
 from abc import abstractmethod, ABC
-from typing import Optional
+from typing import Optional, AsyncIterator
 
-from app.web.domain.models.layer_information_table import LayerInformationTable
+import geopandas as gpd
+import pandas as pd
+
+from app.web.domain.models.layer_information_table import LayerInformationTable, LayerInformationFilter
 
 
 class LayerInformationRepository(ABC):
     @abstractmethod
-    async def get_table(self, collection_name) -> Optional[LayerInformationTable]:
+    async def get_table(self, collection_name, allowed_columns: Optional[list[str]] = None,
+                        cursor: Optional[str] = None, limit: Optional[int] = None,
+                        include_total: bool = False) -> Optional[LayerInformationTable]:
+        pass
+
+    @abstractmethod
+    async def get_snapshot(self, collection_name: str, version: Optional[str],
+                           allowed_columns: list[str]) -> pd.DataFrame:
         pass
 
     @abstractmethod
-    async def get_geometry_and_table(self, collection_name, filters) -> dict:
+    async def get_filters(self, collection_name: str, columns: list[str]) -> list[LayerInformationFilter]:
+        pass
+
+    @abstractmethod
+    async def get_value_counts(self, collection_name: str, columns: list[str]) -> dict[str, list[tuple]]:
+        pass
+
+    @abstractmethod
+    async def get_geometry_and_table(self, collection_name, filters, allowed_columns: list[str],
+                                     match: str = "exact", bbox: Optional[tuple[float, float, float, float]] = None,
+                                     geometry_field: Optional[str] = None) -> dict:
+        pass
+
+    @abstractmethod
+    def iter_features(self, collection_name: str, filters: dict, allowed_columns: list[str],
+                      match: str = "exact", bbox: Optional[tuple[float, float, float, float]] = None,
+                      geometry_field: Optional[str] = None) -> AsyncIterator[dict]:
+        pass
+
+    @abstractmethod
+    async def get_features_frame(self, collection_name: str, filters: dict, allowed_columns: list[str],
+                                 match: str = "exact", bbox: Optional[tuple[float, float, float, float]] = None,
+                                 geometry_field: Optional[str] = None) -> gpd.GeoDataFrame:
+        pass
+
+    @abstractmethod
+    async def get_geojson_frame(self, layer_name: str, row_id: str, allowed_columns: list[str],
+                                geometry_field: Optional[str] = None) -> gpd.GeoDataFrame:
+        pass
+
+    async def get_geojson(self, layer_name: str, row_id: str, geometry_field: Optional[str] = None):
         pass
 
-    async def get_geojson(self, layer_name: str, row_id: str):
+    async def get_geojson_many(self, layer_name: str, row_ids: list[str], geometry_field: Optional[str] = None):
         pass
 
     async def get_columns(self, layer_information_name) -> Optional[dict]:
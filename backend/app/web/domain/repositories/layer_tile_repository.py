@@ -0,0 +1,8 @@
+from abc import abstractmethod, ABC
+
+
+class LayerTileRepository(ABC):
+    @abstractmethod
+    async def get_tile(self, schema_name: str, view_name: str, columns: dict[str, str], z: int, x: int,
+                       y: int) -> bytes:
+        pass
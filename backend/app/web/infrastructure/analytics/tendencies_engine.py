@@ -0,0 +1,105 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Hashable, Optional
+
+import numpy as np
+from cachetools import LRUCache
+from sklearn.cluster import KMeans
+from sklearn.decomposition import PCA
+from sklearn.linear_model import LinearRegression
+
+from app.config import settings
+
+CLUSTER_COLORS = ["#4CAF50", "#2196F3", "#FF9800", "#9C27B0", "#00BCD4", "#FFC107"]
+
+
+def fit_tendencies(x_values: np.ndarray, y_values: np.ndarray, features: np.ndarray, models: list[str],
+                   n_clusters: int, label: str) -> list[dict]:
+    # Se ejecuta en un proceso del pool: solo recibe arreglos y devuelve tipos serializables.
+    tendencies = []
+
+    if "regression" in models and len(x_values) >= 2:
+        # Regresión lineal
+        lr = LinearRegression()
+        lr.fit(x_values, y_values)
+
+        # Línea de tendencia
+        x_min, x_max = x_values.min(), x_values.max()
+        x_line = np.linspace(x_min, x_max, 10).reshape(-1, 1)
+        y_line = lr.predict(x_line)
+
+        regression_result = {
+            "label": label,
+            "data": [{"x": float(x), "y": float(y)} for x, y in zip(x_line.flatten(), y_line)],
+            "original_data": [{"x": float(x[0]), "y": float(y)} for x, y in zip(x_values, y_values)],
+            "borderColor": "#FF5722",
+            "type": "line"
+        }
+        tendencies.append(regression_result)
+
+    if "clusters" in models and len(features) >= n_clusters and features.shape[1] >= 2:
+        # 2) Clustering KMeans
+        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+        clusters = kmeans.fit_predict(features)
+
+        cluster_result = {
+            "label": "Clusters",
+            "data": [{"x": float(row[0]), "y": float(row[1]), "cluster": int(c)}
+                     for row, c in zip(features, clusters)],
+            "type": "scatter",
+            "backgroundColor": [CLUSTER_COLORS[c % len(CLUSTER_COLORS)] for c in clusters]
+        }
+        tendencies.append(cluster_result)
+
+    if "pca" in models and len(features) >= 2 and features.shape[1] >= 2:
+        # 3) PCA
+        pca = PCA(n_components=2)
+        pca_coords = pca.fit_transform(features)
+        pca_result = {
+            "label": "PCA",
+            "data": [{"x": float(x), "y": float(y)} for x, y in pca_coords],
+            "type": "scatter",
+            "backgroundColor": "#9C27B0"
+        }
+        tendencies.append(pca_result)
+
+    return tendencies
+
+
+# Ajusta los modelos fuera del event loop, en un pool de procesos acotado, y guarda los
+# resultados por versión de la capa para no volver a ajustarlos en cada visita.
+class TendenciesEngine:
+    def __init__(self, pool_size: int, cache_size: int):
+        self.__pool_size = pool_size
+        self.__executor: Optional[ProcessPoolExecutor] = None
+        self.__cache: LRUCache = LRUCache(maxsize=cache_size)
+
+    def __get_executor(self) -> ProcessPoolExecutor:
+        if self.__executor is None:
+            # "spawn" evita heredar los hilos y conexiones abiertas del proceso de la API.
+            self.__executor = ProcessPoolExecutor(
+                max_workers=self.__pool_size,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.__executor
+
+    async def fit(self, key: Hashable, x_values: np.ndarray, y_values: np.ndarray, features: np.ndarray,
+                  models: list[str], n_clusters: int, label: str) -> list[dict]:
+        tendencies: Optional[list[dict]] = self.__cache.get(key)
+        if tendencies is not None:
+            return tendencies
+
+        loop = asyncio.get_running_loop()
+        tendencies = await loop.run_in_executor(
+            self.__get_executor(), fit_tendencies, x_values, y_values, features, models, n_clusters, label)
+        self.__cache[key] = tendencies
+        return tendencies
+
+    def shutdown(self) -> None:
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
+
+tendencies_engine = TendenciesEngine(settings.TENDENCIES_POOL_SIZE, settings.TENDENCIES_CACHE_SIZE)
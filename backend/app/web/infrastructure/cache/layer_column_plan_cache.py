@@ -0,0 +1,22 @@
+from cachetools import LRUCache
+
+from app.config import settings
+from app.web.domain.models.layer_column_plan import LayerColumnPlan
+
+
+# Planes de columnas compilados por capa. La clave incluye la versión de layer_columns: cualquier
+# cambio de columnas desde la administración genera una versión nueva y el plan anterior se desaloja.
+class LayerColumnPlanCache:
+    def __init__(self, max_size: int):
+        self.__cache: LRUCache = LRUCache(maxsize=max_size)
+
+    def get(self, columns: dict) -> LayerColumnPlan:
+        key = (columns.get("code"), columns.get("version"))
+        plan = self.__cache.get(key)
+        if plan is None:
+            plan = LayerColumnPlan.from_columns(columns)
+            self.__cache[key] = plan
+        return plan
+
+
+layer_column_plan_cache = LayerColumnPlanCache(settings.LAYER_COLUMN_PLAN_CACHE_SIZE)
@@ -0,0 +1,44 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, Optional
+
+import pandas as pd
+from cachetools import LRUCache
+
+from app.config import settings
+
+
+def _get_size(snapshot: pd.DataFrame) -> int:
+    return int(snapshot.memory_usage(index=True, deep=True).sum())
+
+
+# Copias columnares de las capas, limitadas por memoria (bytes) y desalojadas por LRU.
+# La clave incluye la versión de la capa: una nueva ingesta o un cambio de columnas genera
+# una clave distinta y la copia anterior deja de usarse hasta ser desalojada.
+class LayerSnapshotCache:
+    def __init__(self, max_bytes: int):
+        self.__cache: LRUCache = LRUCache(maxsize=max_bytes, getsizeof=_get_size)
+        self.__locks: dict[Hashable, asyncio.Lock] = {}
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[pd.DataFrame]]) -> pd.DataFrame:
+        snapshot: Optional[pd.DataFrame] = self.__cache.get(key)
+        if snapshot is not None:
+            return snapshot
+
+        # Evita que varias peticiones simultáneas construyan la misma copia.
+        lock = self.__locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                snapshot = self.__cache.get(key)
+                if snapshot is None:
+                    snapshot = await loader()
+                    try:
+                        self.__cache[key] = snapshot
+                    except ValueError:
+                        # La copia supera el presupuesto completo: se usa sin guardarla.
+                        pass
+                return snapshot
+        finally:
+            self.__locks.pop(key, None)
+
+
+layer_snapshot_cache = LayerSnapshotCache(settings.LAYER_SNAPSHOT_CACHE_MAX_BYTES)
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import shutil
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from cachetools import LRUCache
+
+from app.config import settings
+from app.shared.domain.utils.constants import MVT_TILE_ENTRY_OVERHEAD
+
+EMPTY_TILE = b""
+
+
+# Teselas vectoriales en memoria (LRU limitado por bytes) y en disco, por capa y versión.
+# Una nueva versión de la capa usa otro directorio; el de la versión anterior se elimina
+# al guardar la primera tesela de la nueva.
+class LayerTileCache:
+    def __init__(self, max_bytes: int, path: str):
+        self.__cache: LRUCache = LRUCache(maxsize=max_bytes,
+                                          getsizeof=lambda tile: len(tile) + MVT_TILE_ENTRY_OVERHEAD)
+        self.__path = Path(path)
+        self.__locks: dict[tuple, asyncio.Lock] = {}
+
+    async def get(self, code: str, version: str, z: int, x: int, y: int,
+                  loader: Callable[[], Awaitable[bytes]]) -> bytes:
+        key = (code, version, z, x, y)
+        tile: Optional[bytes] = self.__cache.get(key)
+        if tile is not None:
+            return tile
+
+        # Evita que varias peticiones simultáneas generen la misma tesela.
+        lock = self.__locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                tile = self.__cache.get(key)
+                if tile is not None:
+                    return tile
+
+                tile_path = self.__path / code / version / str(z) / str(x) / f"{y}.mvt"
+                tile = await asyncio.to_thread(self.__read, tile_path)
+                if tile is None:
+                    tile = await loader()
+                    if tile:
+                        await asyncio.to_thread(self.__write, tile_path, tile)
+                    else:
+                        # Las teselas fuera de los datos no se guardan en disco; todas comparten el mismo valor.
+                        tile = EMPTY_TILE
+
+                try:
+                    self.__cache[key] = tile
+                except ValueError:
+                    pass
+                return tile
+        finally:
+            self.__locks.pop(key, None)
+
+    @staticmethod
+    def __read(tile_path: Path) -> Optional[bytes]:
+        try:
+            return tile_path.read_bytes()
+        except OSError:
+            return None
+
+    def __write(self, tile_path: Path, tile: bytes) -> None:
+        version_path = tile_path.parents[2]
+        try:
+            if not version_path.exists():
+                for old_version_path in version_path.parent.glob("*"):
+                    shutil.rmtree(old_version_path, ignore_errors=True)
+
+            tile_path.parent.mkdir(parents=True, exist_ok=True)
+            # Escritura atómica: otro proceso nunca lee una tesela a medio escribir.
+            temporary_path = tile_path.with_suffix(f".{os.getpid()}.tmp")
+            temporary_path.write_bytes(tile)
+            os.replace(temporary_path, tile_path)
+        except OSError as e:
+            # Sin disco disponible la tesela se sigue sirviendo desde memoria.
+            print(e)
+
+
+layer_tile_cache = LayerTileCache(settings.LAYER_TILE_CACHE_MAX_BYTES, settings.LAYER_TILE_CACHE_PATH)
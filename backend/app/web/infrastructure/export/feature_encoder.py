@@ -0,0 +1,30 @@
+import io
+
+import geopandas as gpd
+import pyarrow as pa
+import topojson as tp
+
+
+def encode_features(frame: gpd.GeoDataFrame, output_format: str) -> bytes:
+    # Se ejecuta en un hilo: la codificación trabaja sobre columnas y no pasa por GeoJSON.
+    buffer = io.BytesIO()
+
+    if output_format == "flatgeobuf":
+        frame.to_file(buffer, driver="FlatGeobuf", engine="pyogrio")
+    elif output_format == "parquet":
+        frame.to_parquet(buffer, index=False)
+    else:
+        try:
+            table = pa.table(frame.to_arrow(index=False, geometry_encoding="geoarrow"))
+        except ValueError:
+            # GeoArrow nativo exige un único tipo de geometría; si no, se usa WKB.
+            table = pa.table(frame.to_arrow(index=False, geometry_encoding="WKB"))
+        with pa.ipc.new_stream(buffer, table.schema) as writer:
+            writer.write_table(table)
+
+    return buffer.getvalue()
+
+
+def encode_topology(frame: gpd.GeoDataFrame, quantization: int) -> dict:
+    # Los bordes compartidos se guardan una sola vez como arcos con coordenadas enteras.
+    return tp.Topology(frame, prequantize=quantization, object_name="features").to_dict()
@@ -10,4 +10,4 @@ collection: AsyncIOMotorCollection = database.get_collection("base_layers")
 
 class BaseLayerRepositoryImpl(BaseRepository, BaseLayerRepository):
     def __init__(self):
-        super().__init__(collection, BaseLayer)
+        super().__init__(collection, BaseLayer, trusted=True)
@@ -1,6 +1,9 @@
+from typing import Optional
+
 from motor.motor_asyncio import AsyncIOMotorCollection
 
 from app.shared.db.base import database
+from app.shared.infrastructure.cache.metadata_cache import metadata_cache
 from app.shared.infrastructure.persistence.repository.base_repository import BaseRepository
 from app.web.domain.models.category import Category
 from app.web.domain.repositories.category_repository import CategoryRepository
@@ -10,4 +13,9 @@ collection: AsyncIOMotorCollection = database.get_collection("categories")
 
 class CategoryRepositoryImpl(BaseRepository, CategoryRepository):
     def __init__(self):
-        super().__init__(collection, Category)
+        super().__init__(collection, Category, trusted=True)
+
+    async def get(self, document_id: str) -> Optional[Category]:
+        # Lectura a través de la caché de metadatos: la categoría solo cambia desde la administración.
+        get = super().get
+        return await metadata_cache.get("categories", document_id, lambda: get(document_id))
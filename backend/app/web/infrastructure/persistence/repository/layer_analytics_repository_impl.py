@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import DocumentTooLarge
+
+from app.shared.db.base import database
+from app.web.domain.repositories.layer_analytics_repository import LayerAnalyticsRepository
+
+collection: AsyncIOMotorCollection = database.get_collection("layer_analytics")
+
+
+class LayerAnalyticsRepositoryImpl(LayerAnalyticsRepository):
+    # Un documento por capa y tipo de análisis: la lectura siempre es por _id.
+    @staticmethod
+    def __get_id(code: str, kind: str) -> str:
+        return f"{code}:{kind}"
+
+    async def get(self, code: str, version: Optional[str], kind: str) -> Optional[dict]:
+        doc = await collection.find_one({"_id": self.__get_id(code, kind), "version": version}, {"result": 1})
+        if not doc:
+            return None
+        return doc["result"]
+
+    async def save(self, code: str, version: Optional[str], kind: str, result: dict) -> None:
+        try:
+            await collection.replace_one({"_id": self.__get_id(code, kind)}, {
+                "code": code,
+                "version": version,
+                "kind": kind,
+                "result": result,
+                "created_at": datetime.now()
+            }, upsert=True)
+        except DocumentTooLarge as e:
+            # El resultado se sigue entregando, solo que no se materializa.
+            print(e)
@@ -1,118 +1,334 @@
-from collections import Counter
-from typing import Optional
+import re
+from typing import Optional, AsyncIterator
 
+import geopandas as gpd
+import pandas as pd
 from bson import ObjectId
+from bson.errors import InvalidId
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING
+from shapely.geometry import shape
 
 from app.shared.db.base import database
+from app.shared.infrastructure.cache.metadata_cache import metadata_cache
+from app.shared.domain.exceptions.application_exception import ApplicationException
+from app.shared.domain.utils.constants import COORDINATE_SYSTEM, LAYER_FILTER_MIN_OCCURRENCES, LAYER_COLLATION, \
+    LAYER_BBOX_MAX_SPAN, LAYER_GEOMETRY_FIELDS, FILTER_VALUE_TYPES
 from app.web.domain.models.layer_information_table import LayerInformationTable, LayerInformationFilter, \
     LayerInformationOption
 from app.web.domain.repositories.layer_information_repository import LayerInformationRepository
+from app.web.infrastructure.cache.layer_snapshot_cache import layer_snapshot_cache
 
 
 class LayerInformationRepositoryImpl(LayerInformationRepository):
-    async def get_table(self, collection_name) -> Optional[LayerInformationTable]:
+    async def get_table(self, collection_name, allowed_columns: Optional[list[str]] = None,
+                        cursor: Optional[str] = None, limit: Optional[int] = None,
+                        include_total: bool = False) -> Optional[LayerInformationTable]:
         collection: AsyncIOMotorCollection = database.get_collection(collection_name)
 
-        doc = await collection.find_one()
-        if not doc:
-            return None
+        if allowed_columns is None:
+            projection = {field: 0 for field in LAYER_GEOMETRY_FIELDS}
+            doc = await collection.find_one({}, projection)
+            if not doc:
+                return None
+            columns = list(doc.keys())
+        else:
+            if not await collection.find_one({}, {"_id": 1}):
+                return None
+            columns = ["_id", *allowed_columns]
+            projection = {"_id": 1, **{column: 1 for column in allowed_columns}}
 
-        exclude_columns = ['geometry']
-        columns = [k for k in doc.keys() if k not in exclude_columns]
+        # Paginación por conjunto de claves: se continúa a partir del último _id entregado.
+        mongo_filter = {}
+        if cursor:
+            try:
+                mongo_filter["_id"] = {"$gt": ObjectId(cursor)}
+            except InvalidId:
+                raise ApplicationException("El cursor de paginación no es válido")
+
+        documents = collection.find(mongo_filter, projection).sort("_id", ASCENDING)
+        if limit:
+            # Se solicita un documento adicional para saber si existe una página siguiente.
+            documents = documents.limit(limit + 1)
 
-        cursor = collection.find({})
         data = []
-        all_docs = []
-        async for doc in cursor:
-            row = {
+        async for doc in documents:
+            data.append({
                 k: (str(doc[k]) if k == "_id" else doc[k])
-                for k in columns
-            }
-            data.append(row)
-            all_docs.append(doc)
+                for k in columns if k in doc
+            })
+
+        next_cursor = None
+        if limit and len(data) > limit:
+            data = data[:limit]
+            next_cursor = data[-1]["_id"]
+
+        total = await collection.count_documents({}) if include_total else None
+
+        return LayerInformationTable(columns=columns, data=data, next_cursor=next_cursor, total=total)
+
+    async def get_snapshot(self, collection_name: str, version: Optional[str],
+                           allowed_columns: list[str]) -> pd.DataFrame:
+        async def load() -> pd.DataFrame:
+            collection: AsyncIOMotorCollection = database.get_collection(collection_name)
+            projection = {"_id": 1, **{column: 1 for column in allowed_columns}}
+            documents = await collection.find({}, projection).sort("_id", ASCENDING).to_list(length=None)
+            snapshot = pd.DataFrame.from_records(documents, columns=["_id", *allowed_columns])
+            snapshot["_id"] = snapshot["_id"].astype(str)
+            return snapshot
+
+        return await layer_snapshot_cache.get((collection_name, version, tuple(allowed_columns)), load)
+
+    async def get_filters(self, collection_name: str, columns: list[str]) -> list[LayerInformationFilter]:
+        collection: AsyncIOMotorCollection = database.get_collection(collection_name)
+
+        filter_columns = [col for col in columns if col != "_id"]
+        if not filter_columns:
+            return []
+
+        # Una sola agregación: por cada columna se agrupan los valores de texto y solo se conservan
+        # las columnas donde algún valor se repite lo suficiente para ser un filtro.
+        facets = {
+            f"c{index}": [
+                {"$match": {col: {"$type": "string"}}},
+                {"$group": {"_id": f"${col}", "count": {"$sum": 1}}},
+                {"$group": {"_id": None, "values": {"$push": "$_id"}, "max_count": {"$max": "$count"}}},
+                {"$match": {"max_count": {"$gte": LAYER_FILTER_MIN_OCCURRENCES}}},
+            ]
+            for index, col in enumerate(filter_columns)
+        }
+        result = await collection.aggregate([{"$facet": facets}]).to_list(length=1)
+        buckets = result[0] if result else {}
 
         filters: list[LayerInformationFilter] = []
-        for col in columns:
-            values = [str(doc.get(col)) for doc in all_docs if isinstance(doc.get(col), str)]
-            if not values:
+        for index, col in enumerate(filter_columns):
+            bucket = buckets.get(f"c{index}")
+            if not bucket:
                 continue
-            counter = Counter(values)
-            if any(count >= 10 for count in counter.values()):
-                unique_values = sorted(set(values))
-                options = [LayerInformationOption(id=val, label=val) for val in unique_values]
-                filters.append(LayerInformationFilter(name=col, options=options))
+            options = [LayerInformationOption(id=val, label=val) for val in sorted(bucket[0]["values"])]
+            filters.append(LayerInformationFilter(name=col, options=options))
 
-        return LayerInformationTable(columns=columns, data=data, filters=filters)
+        return filters
 
-    @staticmethod
-    def __build_case_insensitive_filter(filters: dict) -> dict:
-        return {
-            key: {"$regex": f".*{value}.*", "$options": "i"}
-            for key, value in filters.items()
-            if value
-        }
+    async def get_value_counts(self, collection_name: str, columns: list[str]) -> dict[str, list[tuple]]:
+        if not columns:
+            return {}
 
-    async def get_geometry_and_table(self, collection_name: str, filters: dict) -> dict:
         collection: AsyncIOMotorCollection = database.get_collection(collection_name)
-        mongo_filter = self.__build_case_insensitive_filter(filters)
 
-        cursor = collection.find(mongo_filter)
-        features = []
+        # Un $facet por columna: se recortan los textos, se agrupa y se conserva el orden de
+        # aparición ordenando por el primer _id de cada grupo.
+        facets = {
+            f"c{index}": [
+                {"$match": {col: {"$ne": None}}},
+                {"$group": {
+                    "_id": {
+                        "$cond": [
+                            {"$eq": [{"$type": f"${col}"}, "string"]},
+                            {"$trim": {"input": f"${col}"}},
+                            f"${col}"
+                        ]
+                    },
+                    "count": {"$sum": 1},
+                    "first_id": {"$min": "$_id"}
+                }},
+                {"$sort": {"first_id": 1}},
+            ]
+            for index, col in enumerate(columns)
+        }
+        result = await collection.aggregate([{"$facet": facets}]).to_list(length=1)
+        buckets = result[0] if result else {}
+
+        return {
+            col: [(bucket["_id"], bucket["count"]) for bucket in buckets.get(f"c{index}", [])]
+            for index, col in enumerate(columns)
+        }
 
-        async for doc in cursor:
-            geometry = doc.get("geometry")
-            if not geometry or not isinstance(geometry, dict):
+    @staticmethod
+    def __build_filter(filters: dict, match: str, allowed_columns: list[str]) -> dict:
+        mongo_filter = {}
+        allowed = set(allowed_columns)
+        for key, value in filters.items():
+            # Solo columnas visibles de la capa y valores simples: nunca operadores de MongoDB.
+            if key not in allowed:
+                raise ApplicationException("Se ha enviado una columna de filtro no válida")
+            values = value if isinstance(value, list) else [value]
+            if not all(isinstance(option, FILTER_VALUE_TYPES) for option in values):
+                raise ApplicationException("Se ha enviado un valor de filtro no válido")
+
+            if not value:
                 continue
+            if isinstance(value, list):
+                # Varias opciones de un mismo filtro: coincidencia exacta con cualquiera de ellas.
+                mongo_filter[key] = {"$in": value}
+            elif match == "prefix":
+                # Rango sobre la intercalación de la capa: aprovecha el índice sin usar expresiones regulares.
+                mongo_filter[key] = {"$gte": str(value), "$lt": f"{value}\uffff"}
+            elif match == "contains":
+                mongo_filter[key] = {"$regex": re.escape(str(value)), "$options": "i"}
+            else:
+                mongo_filter[key] = value
+        return mongo_filter
+
+    @staticmethod
+    def __build_bbox_filter(bbox: tuple[float, float, float, float]) -> Optional[dict]:
+        min_x, min_y, max_x, max_y = bbox
+        if max_x - min_x >= LAYER_BBOX_MAX_SPAN:
+            # Un polígono mayor a un hemisferio no es válido en MongoDB; la vista abarca toda la capa.
+            return None
 
-            properties = {
-                k: (str(v) if k == "_id" else v)
-                for k, v in doc.items()
-                if k != "geometry"
+        # $geoIntersects (y no $geoWithin) para incluir los polígonos que cruzan el borde de la vista.
+        return {
+            "$geoIntersects": {
+                "$geometry": {
+                    "type": "Polygon",
+                    "coordinates": [[
+                        [min_x, min_y], [max_x, min_y], [max_x, max_y], [min_x, max_y], [min_x, min_y]
+                    ]]
+                }
             }
+        }
 
-            features.append({
-                "type": "Feature",
-                "geometry": geometry,
-                "properties": properties
-            })
+    async def get_geometry_and_table(self, collection_name: str, filters: dict, allowed_columns: list[str],
+                                     match: str = "exact", bbox: Optional[tuple[float, float, float, float]] = None,
+                                     geometry_field: Optional[str] = None) -> dict:
+        features = [
+            feature async for feature in self.iter_features(
+                collection_name, filters, allowed_columns, match, bbox, geometry_field)
+        ]
 
         return {
             "type": "FeatureCollection",
             "features": features
         }
 
-    async def get_geojson(self, layer_name: str, row_id: str) -> dict:
-        print(layer_name)
+    def __build_features_filter(self, filters: dict, match: str, allowed_columns: list[str],
+                                bbox: Optional[tuple[float, float, float, float]]) -> dict:
+        mongo_filter = self.__build_filter(filters, match, allowed_columns)
+        if bbox:
+            # Usa el índice 2dsphere creado en la ingesta.
+            bbox_filter = self.__build_bbox_filter(bbox)
+            if bbox_filter:
+                mongo_filter["geometry"] = bbox_filter
+        return mongo_filter
+
+    def iter_features(self, collection_name: str, filters: dict, allowed_columns: list[str],
+                      match: str = "exact", bbox: Optional[tuple[float, float, float, float]] = None,
+                      geometry_field: Optional[str] = None) -> AsyncIterator[dict]:
+        # El filtro se valida al llamar y no al iterar: los errores llegan antes de empezar a transmitir.
+        mongo_filter = self.__build_features_filter(filters, match, allowed_columns, bbox)
+        return self.__iter_features(collection_name, mongo_filter, geometry_field)
+
+    async def __iter_features(self, collection_name: str, mongo_filter: dict,
+                              geometry_field: Optional[str]) -> AsyncIterator[dict]:
+        collection: AsyncIOMotorCollection = database.get_collection(collection_name)
+
+        # La intercalación hace que la comparación ignore mayúsculas y coincida con los índices de la capa.
+        documents = collection.find(mongo_filter, self.__geometry_projection(geometry_field), collation=LAYER_COLLATION)
+        async for doc in documents:
+            feature = self.__to_feature(doc, geometry_field)
+            if feature:
+                yield feature
+
+    async def get_geojson(self, layer_name: str, row_id: str, geometry_field: Optional[str] = None) -> dict:
+        return await self.get_geojson_many(layer_name, [row_id], geometry_field)
+
+    async def get_geojson_many(self, layer_name: str, row_ids: list[str],
+                               geometry_field: Optional[str] = None) -> dict:
+        try:
+            object_ids = [ObjectId(row_id) for row_id in row_ids]
+        except InvalidId:
+            raise ApplicationException("El identificador de la fila no es válido")
+
         collection: AsyncIOMotorCollection = database.get_collection(layer_name)
         cursor = collection.find({
-            "_id": ObjectId(row_id)
-        })
+            "_id": {"$in": object_ids}
+        }, self.__geometry_projection(geometry_field))
 
-        features = []
+        features = {}
         async for doc in cursor:
-            geometry = doc.get("geometry")
-            if not geometry or not isinstance(geometry, dict):
-                continue
+            feature = self.__to_feature(doc, geometry_field)
+            if feature:
+                features[doc["_id"]] = feature
 
-            properties = {
-                k: (str(v) if k == "_id" else v)
-                for k, v in doc.items()
-                if k != "geometry"
-            }
+        # Se respeta el orden en que se pidieron las filas.
+        return {
+            "type": "FeatureCollection",
+            "features": [features[object_id] for object_id in object_ids if object_id in features]
+        }
 
-            features.append({
-                "type": "Feature",
-                "geometry": geometry,
-                "properties": properties
-            })
+    async def get_features_frame(self, collection_name: str, filters: dict, allowed_columns: list[str],
+                                 match: str = "exact", bbox: Optional[tuple[float, float, float, float]] = None,
+                                 geometry_field: Optional[str] = None) -> gpd.GeoDataFrame:
+        collection: AsyncIOMotorCollection = database.get_collection(collection_name)
+        documents = collection.find(
+            self.__build_features_filter(filters, match, allowed_columns, bbox),
+            {"_id": 1, geometry_field or "geometry": 1, **{column: 1 for column in allowed_columns}},
+            collation=LAYER_COLLATION
+        )
+        return await self.__to_frame(documents, allowed_columns, geometry_field)
+
+    async def get_geojson_frame(self, layer_name: str, row_id: str, allowed_columns: list[str],
+                                geometry_field: Optional[str] = None) -> gpd.GeoDataFrame:
+        try:
+            object_id = ObjectId(row_id)
+        except InvalidId:
+            raise ApplicationException("El identificador de la fila no es válido")
+
+        collection: AsyncIOMotorCollection = database.get_collection(layer_name)
+        documents = collection.find(
+            {"_id": object_id},
+            {"_id": 1, geometry_field or "geometry": 1, **{column: 1 for column in allowed_columns}}
+        )
+        return await self.__to_frame(documents, allowed_columns, geometry_field)
+
+    @staticmethod
+    async def __to_frame(documents, allowed_columns: list[str], geometry_field: Optional[str]) -> gpd.GeoDataFrame:
+        geometry_field = geometry_field or "geometry"
+        records = await documents.to_list(length=None)
+
+        # Se arma por columnas directamente desde los documentos, sin pasar por features GeoJSON.
+        frame = pd.DataFrame.from_records(records, columns=["_id", *allowed_columns, geometry_field])
+        frame["_id"] = frame["_id"].astype(str)
+        geometries = gpd.GeoSeries(
+            [shape(geometry) if isinstance(geometry, dict) else None for geometry in frame.pop(geometry_field)],
+            index=frame.index,
+            crs=COORDINATE_SYSTEM
+        )
+        # Igual que en GeoJSON, las filas sin geometría no se entregan.
+        return gpd.GeoDataFrame(frame, geometry=geometries)[geometries.notna()]
+
+    @staticmethod
+    def __geometry_projection(geometry_field: Optional[str]) -> dict:
+        # Solo se lee la geometría que se va a entregar; el resto de niveles no sale de MongoDB.
+        geometry_field = geometry_field or "geometry"
+        return {field: 0 for field in LAYER_GEOMETRY_FIELDS if field != geometry_field}
+
+    @staticmethod
+    def __to_feature(doc: dict, geometry_field: Optional[str]) -> Optional[dict]:
+        geometry_field = geometry_field or "geometry"
+        geometry = doc.get(geometry_field)
+        if not geometry or not isinstance(geometry, dict):
+            return None
+
+        properties = {
+            k: (str(v) if k == "_id" else v)
+            for k, v in doc.items()
+            if k != geometry_field
+        }
 
         return {
-            "type": "FeatureCollection",
-            "features": features
+            "type": "Feature",
+            "geometry": geometry,
+            "properties": properties
         }
 
     async def get_columns(self, layer_information_name: str) -> Optional[dict]:
+        return await metadata_cache.get(
+            "layer_columns", layer_information_name, lambda: self.__load_columns(layer_information_name))
+
+    @staticmethod
+    async def __load_columns(layer_information_name: str) -> Optional[dict]:
         collection: AsyncIOMotorCollection = database.get_collection("layer_columns")
         doc = await collection.find_one({"code": layer_information_name})
 
@@ -124,4 +340,9 @@ class LayerInformationRepositoryImpl(LayerInformationRepository):
             "columns": doc.get("columns", []),
             "columns_with_prefix": doc.get("columns_with_prefix", []),
             "columns_status": doc.get("columns_status", []),
+            "profiles": doc.get("profiles", []),
+            "filters": doc.get("filters"),
+            "tendencies": doc.get("tendencies"),
+            "geometry_levels": doc.get("geometry_levels", []),
+            "version": doc.get("version"),
         }
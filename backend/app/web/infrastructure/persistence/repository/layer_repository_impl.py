@@ -1,6 +1,9 @@
+from typing import Optional
+
 from motor.motor_asyncio import AsyncIOMotorCollection
 
 from app.shared.db.base import database
+from app.shared.infrastructure.cache.metadata_cache import metadata_cache
 from app.shared.infrastructure.persistence.repository.base_repository import BaseRepository
 from app.web.domain.models.layer import Layer
 from app.web.domain.repositories.layer_repository import LayerRepository
@@ -10,4 +13,9 @@ collection: AsyncIOMotorCollection = database.get_collection("layers")
 
 class LayerRepositoryImpl(BaseRepository, LayerRepository):
     def __init__(self):
-        super().__init__(collection, Layer)
+        super().__init__(collection, Layer, trusted=True)
+
+    async def get(self, document_id: str) -> Optional[Layer]:
+        # Lectura a través de la caché de metadatos: la capa solo cambia desde la administración.
+        get = super().get
+        return await metadata_cache.get("layers", document_id, lambda: get(document_id))
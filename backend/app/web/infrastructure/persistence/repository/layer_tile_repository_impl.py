@@ -0,0 +1,51 @@
+import asyncio
+from typing import Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.shared.domain.utils.constants import MVT_EXTENT
+from app.web.domain.repositories.layer_tile_repository import LayerTileRepository
+
+
+class LayerTileRepositoryImpl(LayerTileRepository):
+    # El motor se crea en la primera tesela y se comparte entre peticiones (pool de conexiones).
+    __engine: Optional[Engine] = None
+
+    @classmethod
+    def __get_engine(cls) -> Engine:
+        if cls.__engine is None:
+            cls.__engine = create_engine(settings.POSTGIS_STRING_CONNECTION, pool_pre_ping=True)
+        return cls.__engine
+
+    async def get_tile(self, schema_name: str, view_name: str, columns: dict[str, str], z: int, x: int,
+                       y: int) -> bytes:
+        # psycopg2 es bloqueante: la consulta se ejecuta fuera del bucle de eventos.
+        return await asyncio.to_thread(self.__get_tile, schema_name, view_name, columns, z, x, y)
+
+    def __get_tile(self, schema_name: str, view_name: str, columns: dict[str, str], z: int, x: int, y: int) -> bytes:
+        engine = self.__get_engine()
+        quote = engine.dialect.identifier_preparer.quote
+
+        # Solo las columnas habilitadas, con el nombre que se muestra en el visor.
+        columns_definition = "".join(
+            f", t.{quote(column)} AS {quote(name)}" for column, name in columns.items()
+        )
+        query = text(f"""
+            WITH bounds AS (
+                SELECT ST_TileEnvelope(:z, :x, :y) AS geom
+            ), mvt AS (
+                SELECT ST_AsMVTGeom(ST_Transform(t.geometry, 3857), bounds.geom, :extent) AS geom{columns_definition}
+                FROM {quote(schema_name)}.{quote(view_name)} AS t, bounds
+                WHERE t.geometry && ST_Transform(bounds.geom, 4326)
+            )
+            SELECT ST_AsMVT(mvt.*, :layer_name, :extent, 'geom') FROM mvt
+        """)
+
+        with engine.connect() as connection:
+            tile = connection.execute(query, {
+                "z": z, "x": x, "y": y, "extent": MVT_EXTENT, "layer_name": view_name
+            }).scalar()
+
+        return bytes(tile) if tile else b""
@@ -10,4 +10,4 @@ collection: AsyncIOMotorCollection = database.get_collection("wms_layers")
 
 class WmsLayerRepositoryImpl(BaseRepository, WmsLayerRepository):
     def __init__(self):
-        super().__init__(collection, WmsLayer)
+        super().__init__(collection, WmsLayer, trusted=True)
@@ -6,6 +6,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from starlette import status
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Scope, Receive, Send
 
 from app.admin.api.routes.auth_routes import auth_router
 from app.admin.api.routes.base_layer_routes import base_layer_router
@@ -21,7 +22,10 @@ from app.admin.domain.exceptions.not_authenticated_exception import (
 )
 from app.admin.domain.exceptions.not_found_exception import NotFoundException
 from app.config import settings
+from app.shared.db.base import database
 from app.shared.domain.exceptions.application_exception import ApplicationException
+from app.shared.infrastructure.cache.metadata_cache import metadata_cache
+from app.shared.infrastructure.persistence.repository.document_loader import DocumentLoader
 from app.shared.models.response import Response
 from app.web.api.routes.base_layer_routes import (
     base_layer_router as public_base_layer_router,
@@ -38,6 +42,7 @@ from app.web.api.routes.location_routes import location_router as public_locatio
 from app.web.api.routes.wms_layer_routes import (
     wms_layer_router as public_wms_layer_router,
 )
+from app.web.infrastructure.analytics.tendencies_engine import tendencies_engine
 
 ALLOW_METHODS_AND_HEADERS = ["*"]
 
@@ -70,6 +75,20 @@ class CatchAllMiddleware(BaseHTTPMiddleware):
             return response
 
 
+class DocumentLoaderMiddleware:
+    # Cada petición HTTP tiene sus propios cargadores de documentos (agrupación y memoria por petición).
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with DocumentLoader.scope():
+            await self.app(scope, receive, send)
+
+
 def create_app():
     os.environ["TZ"] = "America/Lima"
 
@@ -93,6 +112,15 @@ def create_app():
     # Then add the catch-all middleware
     application.add_middleware(CatchAllMiddleware)
 
+    application.add_middleware(DocumentLoaderMiddleware)
+
+    # Libera el pool de procesos usado para ajustar los modelos de tendencias.
+    application.add_event_handler("shutdown", tendencies_engine.shutdown)
+
+    # Mantiene coherente la caché de metadatos entre procesos mediante el flujo de cambios de MongoDB.
+    application.add_event_handler("startup", lambda: metadata_cache.start(database))
+    application.add_event_handler("shutdown", metadata_cache.stop)
+
     # application.mount("/static", StaticFiles(directory="static"), name="static")
 
     api_prefix = settings.API_V1_STR